@@ -0,0 +1,260 @@
+# benchmarks/common.py
+# 基準測試共用工具：建立獨立的應用程式與資料庫、產生測試資料、統計延遲、保存與比較結果。
+
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+# 所有測試用戶共用同一組密碼
+BENCH_PASSWORD = 'benchmark-password'
+
+
+# ------------------------------
+# 應用程式與資料庫
+# ------------------------------
+
+def make_app(database_url=None, **overrides):
+    """
+    建立基準測試用的應用程式。未指定 database_url 時使用暫存 SQLite 檔案。
+    回傳 (app, cleanup)；cleanup() 會釋放連線並刪除暫存檔。
+    注意：資料表會先 drop 再重建，請勿指向正式資料庫。
+    """
+    from mealreg import create_app
+    from mealreg.extensions import db
+
+    path = None
+    if database_url is None:
+        fd, path = tempfile.mkstemp(suffix='.sqlite', prefix='mealreg-bench-')
+        os.close(fd)
+        database_url = f'sqlite:///{path}'
+
+    config = {
+        'TITLE': 'mealreg-benchmark',
+        'SECRET_KEY': 'benchmark',
+        'JWT_SECRET_KEY': 'benchmark-jwt-secret-key-0123456789',
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        # 基準測試會在短時間內大量登入，關閉登入節流
+        'LOGIN_THROTTLE_ENABLED': False,
+        # 基準測試量測的是 API 本身，預設使用低成本雜湊 (可用 --password-method 覆寫)
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+        'LOG_LEVEL': 'WARNING',
+    }
+    config.update(overrides)
+    app = create_app(type('BenchmarkConfig', (), config))
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+    def cleanup():
+        from mealreg.services.menu_cache import invalidate_menu_cache
+        from mealreg.services.settings import invalidate_settings
+
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        invalidate_menu_cache()
+        invalidate_settings()
+        if path:
+            os.remove(path)
+
+    return app, cleanup
+
+
+def seed(app, users=200, canteens=5, meals_per_canteen=6, history_days=60, order_rate=0.8, rng_seed=1):
+    """
+    產生測試資料：1 位管理員 (admin)、users 位員工 (emp00000...)、餐廳與便當，
+    以及過去 history_days 天、每位員工每天以 order_rate 機率下的歷史訂單。
+    使用批次 INSERT；完成後重建每日統計表。回傳資料量摘要。
+    """
+    from mealreg.extensions import db
+    from mealreg.models.canteen import Canteen
+    from mealreg.models.meal import Meal
+    from mealreg.models.order import Order
+    from mealreg.models.setting import Setting
+    from mealreg.models.user import User
+    from mealreg.services.meal_revisions import ensure_current_revisions
+    from mealreg.services.order_summary import rebuild_summary
+    from mealreg.services.passwords import hash_password
+
+    rng = random.Random(rng_seed)
+    with app.app_context():
+        password_hash = hash_password(BENCH_PASSWORD)
+        db.session.execute(insert(User), [
+            {'username': 'admin', 'email': 'admin@bench.local', 'is_admin': True, 'password_hash': password_hash}
+        ] + [
+            {'username': employee_name(i), 'email': f'{employee_name(i)}@bench.local', 'is_admin': False, 'password_hash': password_hash}
+            for i in range(users)
+        ])
+        # 截止時間設為 23:59，讓當日下訂單不受執行時間影響
+        db.session.add(Setting(key='ORDER_CUTOFF_TIME', value='23:59'))
+        db.session.execute(insert(Canteen), [{'name': f'餐廳 {c + 1}'} for c in range(canteens)])
+        canteen_ids = db.session.scalars(db.select(Canteen.id).order_by(Canteen.id)).all()
+        db.session.execute(insert(Meal), [
+            {'name': f'便當 {cid}-{m + 1}', 'price': rng.randrange(60, 160) * 100, 'canteen_id': cid}
+            for cid in canteen_ids for m in range(meals_per_canteen)
+        ])
+        ensure_current_revisions()
+        meals = db.session.execute(db.select(Meal.id, Meal.current_revision_id)).all()
+        user_ids = db.session.scalars(db.select(User.id).where(User.is_admin.is_(False))).all()
+
+        today = date.today()
+        orders = []
+        for days_ago in range(1, history_days + 1):
+            order_date = today - timedelta(days=days_ago)
+            for user_id in user_ids:
+                if rng.random() < order_rate:
+                    meal = rng.choice(meals)
+                    orders.append({
+                        'user_id': user_id, 'meal_id': meal.id, 'meal_revision_id': meal.current_revision_id,
+                        'order_date': order_date,
+                        'is_paid': days_ago > 30,
+                    })
+        for start in range(0, len(orders), 5000):
+            db.session.execute(insert(Order), orders[start:start + 5000])
+        db.session.commit()
+        rebuild_summary()
+
+        return {
+            'users': len(user_ids), 'canteens': len(canteen_ids),
+            'meals': len(meals), 'historical_orders': len(orders),
+            'meal_ids': [meal.id for meal in meals],
+        }
+
+
+def employee_name(i):
+    return f'emp{i:05d}'
+
+
+# ------------------------------
+# 統計
+# ------------------------------
+
+def percentile(sorted_values, pct):
+    """nearest-rank 百分位數 (sorted_values 需已排序)"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(samples, wall_seconds):
+    """
+    samples: {名稱: [(秒數, 是否錯誤), ...]}
+    回傳 {名稱: {count, errors, mean_ms, p50_ms, p99_ms, max_ms, rps}}
+    """
+    stats = {}
+    for name, entries in samples.items():
+        durations = sorted(duration for duration, _ in entries)
+        stats[name] = {
+            'count': len(entries),
+            'errors': sum(1 for _, error in entries if error),
+            'mean_ms': round(sum(durations) / len(durations) * 1000, 3),
+            'p50_ms': round(percentile(durations, 50) * 1000, 3),
+            'p99_ms': round(percentile(durations, 99) * 1000, 3),
+            'max_ms': round(durations[-1] * 1000, 3),
+            'rps': round(len(entries) / wall_seconds, 1) if wall_seconds else 0.0,
+        }
+    return stats
+
+
+def print_stats(stats, title=None):
+    if title:
+        print(title)
+    print(f"{'endpoint':<40}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'req/s':>10}")
+    for name, row in stats.items():
+        print(f"{name:<40}{row['count']:>8}{row['errors']:>8}{row['p50_ms']:>10.2f}{row['p99_ms']:>10.2f}{row['max_ms']:>10.2f}{row['rps']:>10.1f}")
+
+
+# ------------------------------
+# 結果保存與比較
+# ------------------------------
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(__file__), timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def save_results(name, params, stats, results_dir=RESULTS_DIR, extra=None):
+    """將結果寫入 results_dir/<name>-<時間>.json，回傳檔案路徑"""
+    os.makedirs(results_dir, exist_ok=True)
+    now = datetime.now()
+    record = {
+        'name': name,
+        'timestamp': now.isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': params,
+        'stats': stats,
+    }
+    if extra:
+        record.update(extra)
+    path = os.path.join(results_dir, f"{name}-{now.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(record, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def load_baseline(name, params, results_dir=RESULTS_DIR):
+    """找出同名、同參數的最近一次結果作為比較基準；找不到時回傳 None"""
+    if not os.path.isdir(results_dir):
+        return None
+    candidates = sorted(
+        (f for f in os.listdir(results_dir) if f.startswith(f'{name}-') and f.endswith('.json')),
+        reverse=True
+    )
+    for filename in candidates:
+        path = os.path.join(results_dir, filename)
+        with open(path, encoding='utf-8') as f:
+            record = json.load(f)
+        if record.get('params') == params:
+            record['path'] = path
+            return record
+    return None
+
+
+def compare(stats, baseline, threshold_pct=20.0):
+    """
+    與基準比較 p50/p99 與吞吐量並印出差異。
+    p99 變慢超過 threshold_pct% 的端點視為回歸，回傳回歸的端點名稱列表。
+    """
+    print(f"\n與基準比較: {baseline['path']} (commit {baseline.get('git_commit')}, {baseline['timestamp']})")
+    print(f"{'endpoint':<40}{'p50 Δ%':>10}{'p99 Δ%':>10}{'req/s Δ%':>10}")
+    regressions = []
+    for name, row in stats.items():
+        base = baseline['stats'].get(name)
+        if not base:
+            print(f"{name:<40}{'(new)':>10}")
+            continue
+        deltas = [_delta(row[key], base[key]) for key in ('p50_ms', 'p99_ms', 'rps')]
+        flag = ''
+        if deltas[1] is not None and deltas[1] > threshold_pct:
+            regressions.append(name)
+            flag = '  ✗ regression'
+        print(f"{name:<40}" + ''.join(f"{_fmt(d):>10}" for d in deltas) + flag)
+    return regressions
+
+
+def _delta(current, base):
+    if not base:
+        return None
+    return (current - base) / base * 100
+
+
+def _fmt(delta):
+    return '-' if delta is None else f'{delta:+.1f}'
+
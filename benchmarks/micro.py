@@ -0,0 +1,123 @@
+# benchmarks/micro.py
+# 訂餐熱路徑的微基準測試：在已建立測試資料的資料庫上，直接重複呼叫單一函式並量測每次呼叫的耗時，
+# 用來定位壓力測試 (ordering_flow) 中變慢的端點是哪一段造成的。
+# 執行方式: python -m benchmarks.micro [--repeat 200] [--users 500] [--only menu_build ...]
+
+import argparse
+import time
+from datetime import date, timedelta
+
+from .common import compare, load_baseline, make_app, print_stats, save_results, seed, summarize
+
+
+def _cases(app, seeded, args):
+    """回傳 {名稱: 無參數函式}；每個函式在 app context 內執行一次被量測的操作"""
+    from mealreg.api.public import build_active_menu
+    from mealreg.extensions import db
+    from mealreg.models.user import User
+    from mealreg.services.order_summary import summary_deltas
+    from mealreg.services.ordering import load_meal_map, place_orders_bulk
+    from mealreg.services.pagination import decode_cursor, encode_cursor
+
+    meal_ids = seeded['meal_ids']
+    user_ids = db.session.scalars(db.select(User.id).where(User.is_admin.is_(False))).all()
+    client = app.test_client()
+    batch_dates = iter(date.today() + timedelta(days=100 + i) for i in range(10 ** 6))
+    synthetic_rows = [
+        {'order_date': date(2000, 1, 1) + timedelta(days=i % 20), 'meal_revision_id': i % 30 + 1}
+        for i in range(10000)
+    ]
+
+    def menu_build():
+        build_active_menu()
+        db.session.rollback()
+
+    def menu_cached_request():
+        client.get('/public/menu').get_data()
+
+    def meal_map():
+        load_meal_map(meal_ids[:3])
+        db.session.rollback()
+
+    def bulk_orders():
+        # 每次使用新的日期，讓每一輪都是真正的寫入
+        order_date = next(batch_dates)
+        items = [
+            {'user_id': user_id, 'meal_id': meal_ids[i % len(meal_ids)], 'order_date': order_date}
+            for i, user_id in enumerate(user_ids[:args.batch_size])
+        ]
+        place_orders_bulk(items)
+
+    def deltas_10k():
+        summary_deltas(synthetic_rows)
+
+    def cursor_roundtrip():
+        decode_cursor(encode_cursor(date(2000, 1, 15), 14), date, int)
+
+    return {
+        'menu_build': menu_build,
+        'menu_cached_request': menu_cached_request,
+        'load_meal_map': meal_map,
+        f'place_orders_bulk[{args.batch_size}]': bulk_orders,
+        'summary_deltas[10000]': deltas_10k,
+        'cursor_roundtrip': cursor_roundtrip,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='訂餐熱路徑微基準測試')
+    parser.add_argument('--repeat', type=int, default=200, help='每個項目的量測次數')
+    parser.add_argument('--warmup', type=int, default=5, help='量測前的暖機次數')
+    parser.add_argument('--users', type=int, default=500, help='測試資料的員工人數')
+    parser.add_argument('--history-days', type=int, default=30, help='歷史訂單天數')
+    parser.add_argument('--batch-size', type=int, default=200, help='place_orders_bulk 每批筆數 (不超過員工人數)')
+    parser.add_argument('--only', action='append', help='只執行名稱以此開頭的項目，可重複指定')
+    parser.add_argument('--database-url', help='資料庫 URL (預設為暫存 SQLite；會被清空重建)')
+    parser.add_argument('--no-save', action='store_true', help='不保存結果')
+    parser.add_argument('--threshold', type=float, default=20.0, help='p99 變慢超過此百分比視為回歸')
+    parser.add_argument('--fail-on-regression', action='store_true', help='發現回歸時以非零狀態碼結束')
+    args = parser.parse_args()
+
+    app, cleanup = make_app(args.database_url)
+    try:
+        seeded = seed(app, users=args.users, history_days=args.history_days)
+        samples = {}
+        with app.app_context():
+            from mealreg.extensions import db
+            dialect = db.engine.dialect.name
+            for name, func in _cases(app, seeded, args).items():
+                if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                    continue
+                for _ in range(args.warmup):
+                    func()
+                entries = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    func()
+                    entries.append((time.perf_counter() - start, False))
+                samples[name] = entries
+    finally:
+        cleanup()
+
+    # 微基準測試的 req/s 即為單執行緒每秒可呼叫次數
+    stats = summarize(samples, 0)
+    for row in stats.values():
+        row['rps'] = round(1000 / row['mean_ms'], 1) if row['mean_ms'] else 0.0
+    print_stats(stats, title=f"\n每個項目量測 {args.repeat} 次 ({dialect})")
+
+    params = {
+        'repeat': args.repeat, 'users': args.users, 'history_days': args.history_days,
+        'batch_size': args.batch_size, 'only': args.only, 'database': dialect,
+    }
+    baseline = load_baseline('micro', params)
+    regressions = compare(stats, baseline, args.threshold) if baseline else []
+    if not baseline:
+        print("\n(沒有相同參數的先前結果可比較)")
+    if not args.no_save:
+        print(f"-> 結果已保存: {save_results('micro', params, stats)}")
+    if regressions and args.fail_on_regression:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# benchmarks/password_hash.py
+# 密碼雜湊成本基準測試：對每種雜湊設定，量測單一核心每秒可完成的登入驗證次數 (logins/sec/core)，
+# 作為設定 PASSWORD_HASH_METHOD 的參考。
+# 執行方式: python -m benchmarks.password_hash [--seconds 2] [--method scrypt:16384:8:1 ...]
+
+import argparse
+import time
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# 預設比較的雜湊設定 (werkzeug 方法字串)
+DEFAULT_METHODS = [
+    'scrypt:32768:8:1',      # werkzeug 預設
+    'scrypt:16384:8:1',
+    'pbkdf2:sha256:1000000', # werkzeug 預設的 pbkdf2 迭代次數
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:260000',
+]
+
+
+def measure(method, seconds):
+    """在單一執行緒中重複驗證同一組密碼，回傳 (每秒驗證次數, 單次毫秒數)"""
+    password_hash = generate_password_hash('benchmark-password', method=method)
+    count = 0
+    start = time.perf_counter()
+    while True:
+        check_password_hash(password_hash, 'benchmark-password')
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            break
+    return count / elapsed, elapsed / count * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='密碼雜湊設定的登入驗證吞吐量 (單一核心)')
+    parser.add_argument('--seconds', type=float, default=2.0, help='每種設定的量測時間 (秒)')
+    parser.add_argument('--method', action='append', help='要量測的雜湊方法，可重複指定')
+    args = parser.parse_args()
+
+    print(f"{'PASSWORD_HASH_METHOD':<26}{'logins/sec/core':>18}{'ms/login':>12}")
+    for method in args.method or DEFAULT_METHODS:
+        rate, ms = measure(method, args.seconds)
+        print(f"{method:<26}{rate:>18.1f}{ms:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+# benchmarks/query_plans.py
+# 查詢計畫回歸檢查：
+# 在獨立的 SQLite 資料庫上建立測試資料，實際呼叫每個 API 端點並記錄其發出的 SQL，
+# 再以 EXPLAIN QUERY PLAN 檢查每一條查詢；若有不在允許清單內的全表掃描 (SCAN <table>) 即視為失敗。
+#
+# 執行方式: python -m benchmarks.query_plans (發現全表掃描時以非零狀態碼結束，可放在 CI)
+
+import argparse
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+from .common import make_app
+
+# 要檢查的端點: (名稱, HTTP 方法, 路徑, JSON body, 使用的身分, 允許清單)
+# 允許清單的項目:
+#   '<table>'        允許對該表全表掃描；只用於「本來就要回傳整張表」的管理列表，以及資料量極小的維度表 (canteen)
+#   '<table>:keyset' keyset 分頁：只允許依索引順序掃描 (SCAN <table> USING INDEX，由 LIMIT 截斷)，
+#                    計畫中若還需要暫存 B-tree 排序 (讀完所有符合的列才能 LIMIT) 仍視為失敗
+ENDPOINT_CHECKS = [
+    ('公開菜單', 'GET', '/public/menu', None, None, {'canteen'}),
+    ('員工下訂單', 'POST', '/orders/', {'meal_id': 1}, 'employee', set()),
+    ('預訂未來日期', 'POST', '/orders/', {'meal_id': 2, 'order_date': '2099-01-05'}, 'employee', set()),
+    ('預訂一週', 'POST', '/orders/book', {'orders': [{'meal_id': 1, 'order_date': f'2099-01-{day:02d}'} for day in range(5, 12)]}, 'employee', set()),
+    ('訂餐行事曆', 'GET', '/orders/calendar?start_date=2099-01-05&days=7', None, 'employee', set()),
+    ('批次下訂單', 'POST', '/orders/batch', {'orders': [{'user_id': 1, 'meal_id': 1}, {'user_id': 2, 'meal_id': 2}]}, 'admin', set()),
+    ('我的訂單', 'GET', '/orders/mine', None, 'employee', set()),
+    ('我的訂單 (游標+日期)', 'GET', '/orders/mine?limit=5&start_date=2000-01-01&end_date=2000-12-31&cursor=WyIyMDAwLTAxLTE1IiwgMTRd', None, 'employee', set()),
+    ('每日統計', 'GET', '/orders/summary', None, 'admin', set()),
+    ('單筆結算', 'PUT', '/orders/1/paid', None, 'admin', set()),
+    ('批次結算 (ID)', 'PUT', '/orders/paid', {'order_ids': [1, 2]}, 'admin', set()),
+    ('批次結算 (用戶+日期)', 'PUT', '/orders/paid', {'user_id': 2, 'start_date': '2000-01-01', 'end_date': '2000-01-31'}, 'admin', set()),
+    ('批次結算 (日期)', 'PUT', '/orders/paid', {'start_date': '2000-01-01', 'end_date': '2000-01-31'}, 'admin', set()),
+    ('用戶對帳單', 'GET', '/orders/reports/users?start_date=2000-01-01&end_date=2000-12-31&by_date=true', None, 'admin', set()),
+    ('餐廳週彙總', 'GET', '/orders/reports/canteens?start_date=2000-01-01&end_date=2000-12-31&period=week', None, 'admin', {'canteen'}),
+    ('訂單匯出', 'GET', '/orders/reports/export?start_date=2000-01-01&end_date=2000-12-31&is_paid=false&canteen_id=1', None, 'admin', set()),
+    ('備餐清單 (未截止)', 'GET', '/orders/reports/production?date=2099-01-05', None, 'admin', {'canteen'}),
+    ('備餐清單 (凍結)', 'GET', '/orders/reports/production?date=2000-01-10&canteen_id=1', None, 'admin', set()),
+    ('每日統計 (凍結)', 'GET', '/orders/summary?date=2000-01-11', None, 'admin', set()),
+    ('應繳金額匯出', 'GET', '/orders/reports/export?detail=charges&start_date=2000-01-01&end_date=2000-12-31', None, 'admin', set()),
+    ('餐廳列表', 'GET', '/admin/canteens/', None, 'admin', {'canteen'}),
+    ('便當列表', 'GET', '/admin/meals/', None, 'admin', {'meal:keyset'}),
+    ('便當列表 (游標)', 'GET', '/admin/meals/?limit=1&cursor=WzEsIDFd', None, 'admin', {'meal:keyset'}),
+    ('系統設定列表', 'GET', '/admin/settings/', None, 'admin', {'setting'}),
+    ('修改便當價格', 'PUT', '/admin/meals/2', {'price': 95}, 'admin', set()),
+    ('刪除訂單', 'DELETE', '/orders/del/{employee_order_id}', None, 'employee', set()),
+]
+
+
+def _seed():
+    """建立檢查用的最小資料集 (含歷史訂單)"""
+    from mealreg.extensions import db
+    from mealreg.models.canteen import Canteen
+    from mealreg.models.meal import Meal
+    from mealreg.models.order import Order
+    from mealreg.models.setting import Setting
+    from mealreg.models.user import User
+    from mealreg.services.meal_revisions import record_revision
+
+    admin = User(username='admin', email='admin@example.com', is_admin=True, password_hash='x')
+    employee = User(username='employee', email='employee@example.com', is_admin=False, password_hash='x')
+    db.session.add_all([admin, employee, Setting(key='ORDER_CUTOFF_TIME', value='23:59'),
+                        Setting(key='ORDER_BOOKING_DAYS', value='36500')])
+    canteen = Canteen(name='檢查餐廳')
+    db.session.add(canteen)
+    db.session.flush()
+    meals = [
+        Meal(name='便當 A', price=10000, canteen_id=canteen.id),
+        Meal(name='便當 B', price=9000, canteen_id=canteen.id),
+    ]
+    db.session.add_all(meals)
+    db.session.flush()
+    for meal in meals:
+        record_revision(meal)
+    for day in range(1, 29):
+        db.session.add(Order(
+            user_id=employee.id, meal_id=meals[0].id, meal_revision_id=meals[0].current_revision_id,
+            order_date=date(2000, 1, 1) + timedelta(days=day)
+        ))
+    db.session.commit()
+    return admin.id, employee.id
+
+
+def _explain(connection, statement, parameters):
+    """回傳 EXPLAIN QUERY PLAN 的 detail 欄位列表"""
+    if isinstance(parameters, list):
+        parameters = parameters[0] if parameters else ()
+    rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+    return [row[-1] for row in rows]
+
+
+def _full_scans(details, allowed):
+    """
+    找出計畫中不允許的全表掃描 (SCAN <table>，不含 SCAN CONSTANT ROW 等)。
+    SQLite 的 AUTOMATIC INDEX 是查詢時臨時掃描整張表建立的索引，同樣視為缺少索引。
+    """
+    scans = []
+    keyset = {entry.split(':')[0] for entry in allowed if entry.endswith(':keyset')}
+    for detail in details:
+        if 'USING AUTOMATIC' in detail:
+            scans.append(detail)
+            continue
+        if keyset and detail.startswith('USE TEMP B-TREE FOR') and 'ORDER BY' in detail:
+            scans.append(detail)
+            continue
+        if not detail.startswith('SCAN '):
+            continue
+        table = detail.split()[1]
+        if table in ('CONSTANT', 'SUBQUERY') or table in allowed:
+            continue
+        if table in keyset and ' USING ' in detail and 'INDEX' in detail:
+            continue
+        scans.append(detail)
+    return scans
+
+
+def check_query_plans(echo=print):
+    """
+    在暫存 SQLite 上建立獨立的應用程式，逐一呼叫 ENDPOINT_CHECKS 並檢查查詢計畫。
+    回傳發現的問題列表 (空列表代表全部通過)。
+    """
+    from flask_jwt_extended import create_access_token
+
+    from mealreg.extensions import db
+    from mealreg.services.settings import get_all_settings, invalidate_settings
+
+    app, cleanup = make_app(TITLE='query-plan-check', TESTING=True, FREEZE_SCHEDULER_ENABLED=False)
+
+    problems = []
+    try:
+        with app.app_context():
+            admin_id, employee_id = _seed()
+            tokens = {
+                'admin': create_access_token(identity=str(admin_id)),
+                'employee': create_access_token(identity=str(employee_id)),
+            }
+            employee_order_id = 1
+
+            captured = []
+
+            def capture(_conn, _cursor, statement, parameters, _context, executemany):
+                captured.append((statement, parameters))
+
+            event.listen(db.engine, 'before_cursor_execute', capture)
+            client = app.test_client()
+            invalidate_settings()
+            # 設定表本來就是整表載入後快取 (見 services/settings.py)，先載入一次，避免計入第一個用到設定的端點
+            get_all_settings()
+
+            for name, method, url, body, role, allowed in ENDPOINT_CHECKS:
+                captured.clear()
+                headers = {'Authorization': f'Bearer {tokens[role]}'} if role else {}
+                response = client.open(
+                    url.format(employee_order_id=employee_order_id),
+                    method=method, json=body, headers=headers
+                )
+                # 串流回應的查詢在讀取內容時才會執行
+                response.get_data()
+                response.close()
+                if method == 'POST' and url == '/orders/' and response.status_code == 201:
+                    employee_order_id = response.get_json()['id']
+
+                statements = [
+                    (statement, parameters) for statement, parameters in captured
+                    if statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE', 'WITH'))
+                ]
+                echo(f"[{response.status_code}] {name} {method} {url}: {len(statements)} 條查詢")
+                if response.status_code >= 500:
+                    problems.append(f"{name}: 端點回傳 {response.status_code}")
+
+                with db.engine.connect() as connection:
+                    for statement, parameters in statements:
+                        scans = _full_scans(_explain(connection, statement, parameters), allowed)
+                        if scans:
+                            problems.append(f"{name}: {'; '.join(scans)}\n    {' '.join(statement.split())}")
+
+            event.remove(db.engine, 'before_cursor_execute', capture)
+    finally:
+        cleanup()
+
+    return problems
+
+
+def main():
+    argparse.ArgumentParser(description='以 EXPLAIN QUERY PLAN 檢查所有端點查詢是否使用索引').parse_args()
+    problems = check_query_plans()
+    if problems:
+        for problem in problems:
+            print(f"✗ {problem}")
+        raise SystemExit(1)
+    print("-> 所有端點查詢皆有使用索引。")
+
+
+if __name__ == '__main__':
+    main()
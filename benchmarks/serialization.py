@@ -0,0 +1,139 @@
+# benchmarks/serialization.py
+# 唯讀列表端點的序列化成本：以 10k 列的回應比較
+#   marshmallow: 手寫 dict (order_to_out / meal_row_to_out) → @output Schema dump → JSON (原本的流程)
+#   fast       : RowEncoder 直接由查詢列產生 JSON (services/fast_json.py；有安裝 orjson 時使用 orjson)
+# 分為只量測序列化 (查詢結果預先取回) 與完整請求 (含查詢，FAST_JSON_ENABLED 切換) 兩組，並換算每列成本。
+#
+# 執行方式: python -m benchmarks.serialization [--rows 10000] [--repeat 30]
+
+import argparse
+import time
+from datetime import date, timedelta
+
+from .common import compare, load_baseline, make_app, print_stats, save_results, seed, summarize
+
+
+def _seed_orders(app, rows):
+    """替第一位員工建立 rows 筆歷史訂單 (每天一筆)，回傳該員工的 ID"""
+    from sqlalchemy import insert
+
+    from mealreg.extensions import db
+    from mealreg.models.meal import Meal
+    from mealreg.models.order import Order
+    from mealreg.models.user import User
+
+    with app.app_context():
+        user_id = db.session.scalars(db.select(User.id).where(User.is_admin.is_(False)).order_by(User.id)).first()
+        meals = db.session.execute(db.select(Meal.id, Meal.current_revision_id)).all()
+        today = date.today()
+        orders = [
+            {
+                'user_id': user_id, 'meal_id': meals[i % len(meals)].id,
+                'meal_revision_id': meals[i % len(meals)].current_revision_id,
+                'order_date': today - timedelta(days=i + 1), 'is_paid': i % 2 == 0,
+            }
+            for i in range(rows)
+        ]
+        for start in range(0, len(orders), 5000):
+            db.session.execute(insert(Order), orders[start:start + 5000])
+        db.session.commit()
+        return user_id
+
+
+def _cases(app, user_id, rows):
+    """回傳 {名稱: 無參數函式}"""
+    from flask import current_app
+    from flask_jwt_extended import create_access_token
+
+    from mealreg.api.meal import MEAL_ENCODER, MEAL_LIST_COLUMNS, MealOut, meal_row_to_out
+    from mealreg.api.order import ORDER_ENCODER, OrderOut, my_orders_stmt, order_to_out
+    from mealreg.extensions import db
+    from mealreg.models.canteen import Canteen
+    from mealreg.models.meal import Meal
+    from mealreg.models.user import User
+
+    order_rows = db.session.execute(my_orders_stmt(user_id, {}, rows)).all()
+    meal_rows = db.session.execute(
+        db.select(*MEAL_LIST_COLUMNS).join(Canteen, Meal.canteen_id == Canteen.id).order_by(Meal.canteen_id, Meal.id).limit(rows)
+    ).all()
+    order_schema = OrderOut(many=True)
+    meal_schema = MealOut(many=True)
+
+    admin_id = db.session.scalars(db.select(User.id).where(User.is_admin.is_(True))).first()
+    client = app.test_client()
+    employee = {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+    admin = {'Authorization': f'Bearer {create_access_token(identity=str(admin_id))}'}
+
+    def request(path, headers, fast):
+        def run():
+            current_app.config['FAST_JSON_ENABLED'] = fast
+            response = client.get(path, headers=headers)
+            response.get_data()
+            assert response.status_code == 200, response.status_code
+        return run
+
+    return {
+        f'orders marshmallow[{len(order_rows)}]': lambda: current_app.json.dumps(order_schema.dump([order_to_out(row) for row in order_rows])),
+        f'orders fast[{len(order_rows)}]': lambda: ORDER_ENCODER.encode(order_rows),
+        f'meals marshmallow[{len(meal_rows)}]': lambda: current_app.json.dumps(meal_schema.dump([meal_row_to_out(row) for row in meal_rows])),
+        f'meals fast[{len(meal_rows)}]': lambda: MEAL_ENCODER.encode(meal_rows),
+        'GET /orders/mine marshmallow': request(f'/orders/mine?limit={rows}', employee, False),
+        'GET /orders/mine fast': request(f'/orders/mine?limit={rows}', employee, True),
+        'GET /admin/meals marshmallow': request(f'/admin/meals/?limit={rows}', admin, False),
+        'GET /admin/meals fast': request(f'/admin/meals/?limit={rows}', admin, True),
+    }
+
+
+def main():
+    from mealreg.services.fast_json import orjson
+
+    parser = argparse.ArgumentParser(description='列表端點序列化成本 (marshmallow 與快速序列化比較)')
+    parser.add_argument('--rows', type=int, default=10000, help='每個回應的列數')
+    parser.add_argument('--repeat', type=int, default=30, help='每個項目的量測次數')
+    parser.add_argument('--warmup', type=int, default=3, help='量測前的暖機次數')
+    parser.add_argument('--database-url', help='資料庫 URL (預設為暫存 SQLite；會被清空重建)')
+    parser.add_argument('--no-save', action='store_true', help='不保存結果')
+    parser.add_argument('--threshold', type=float, default=20.0, help='p99 變慢超過此百分比視為回歸')
+    args = parser.parse_args()
+
+    backend = 'orjson' if orjson is not None else 'json'
+    app, cleanup = make_app(args.database_url, PAGE_SIZE_MAX=args.rows, METRICS_ENABLED=False)
+    try:
+        # 20 間餐廳平均分配 rows 個便當
+        seed(app, users=1, canteens=20, meals_per_canteen=-(-args.rows // 20), history_days=0)
+        user_id = _seed_orders(app, args.rows)
+        samples = {}
+        with app.app_context():
+            from mealreg.extensions import db
+            dialect = db.engine.dialect.name
+            for name, func in _cases(app, user_id, args.rows).items():
+                for _ in range(args.warmup):
+                    func()
+                entries = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    func()
+                    entries.append((time.perf_counter() - start, False))
+                samples[name] = entries
+    finally:
+        cleanup()
+
+    stats = summarize(samples, 0)
+    for row in stats.values():
+        row['rps'] = round(1000 / row['mean_ms'], 1) if row['mean_ms'] else 0.0
+        row['per_row_us'] = round(row['p50_ms'] * 1000 / args.rows, 3)
+    print_stats(stats, title=f"\n{args.rows} 列的回應，每個項目量測 {args.repeat} 次 (JSON: {backend}, {dialect})")
+    print(f"\n{'每列成本 (p50)':<40}{'µs/列':>10}")
+    for name, row in stats.items():
+        print(f"{name:<40}{row['per_row_us']:>10.3f}")
+
+    params = {'rows': args.rows, 'repeat': args.repeat, 'json': backend, 'database': dialect}
+    baseline = load_baseline('serialization', params)
+    if baseline:
+        compare(stats, baseline, args.threshold)
+    if not args.no_save:
+        print(f"-> 結果已保存: {save_results('serialization', params, stats)}")
+
+
+if __name__ == '__main__':
+    main()
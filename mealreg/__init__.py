@@ -1,3 +1,5 @@
+import time
+
 from apiflask import APIFlask
 from flask import Flask, render_template
 from .config import Config
@@ -5,14 +7,38 @@ from .extensions import db, jwt
 
 # **這是應用程式工廠函式**：標準的 Flask/APIFlask 實例建立方式
 def create_app(config_class=Config):
+    started = time.perf_counter()
     # 建立 APIFlask 實例
     app = APIFlask(__name__, title=config_class.TITLE)
 
     # 載入配置
     app.config.from_object(config_class)
-    # 初始化擴展套件
+    # 位於反向代理 (nginx 等) 之後時，設定 PROXY_FIX_X_FOR = 代理層數，
+    # 讓 request.remote_addr 取自 X-Forwarded-For (登入節流與 /metrics 的來源位址限制依此判斷)
+    if app.config.get('PROXY_FIX_X_FOR'):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'], x_proto=app.config['PROXY_FIX_X_FOR'])
+    # 設定結構化日誌 (JSON、分級、取樣、佇列非同步寫出)
+    from .log import init_logging
+    init_logging(app)
+
+    # 初始化擴展套件 (連線池參數需在 db.init_app 之前套用；建立 app 時不連線資料庫)
+    from .services.db_pool import configure_engine_options
+    configure_engine_options(app)
     db.init_app(app)
     jwt.init_app(app)
+    # 讀寫分離的「讀得到自己的寫入」標記 (寫入後以短效 Cookie 帶回，跨 worker 有效)
+    from .extensions import init_read_your_writes
+    init_read_your_writes(app)
+
+    # 註冊 JWT 用戶載入回呼 (current_user) 並套用用戶快取設定
+    from .services.user_cache import configure_user_cache
+    configure_user_cache(app)
+    # 註冊 JWT 撤銷清單檢查 (JWT_REVOCATION_ENABLED)
+    from .services import token_store
+    # 註冊端點效能指標 (延遲、SQL 數量、DB 時間；METRICS_ENABLED = True 時啟用)
+    from .services.metrics import init_metrics
+    init_metrics(app)
 
     # ===============================================
     # ❗ 關鍵修正：註冊 auth 藍圖
@@ -22,12 +48,26 @@ def create_app(config_class=Config):
     from .api.meal import meal_bp
     from .api.public import public_bp
     from .api.order import order_bp
+    from .api.report import report_bp
+    from .api.setting import setting_bp
+    from .api.metrics import metrics_bp
 
     app.register_blueprint(auth_bp) # 由於 auth_bp 已經設定 url_prefix='/auth'，這裡無需再設定
     app.register_blueprint(canteen_bp) # 由於 canteen_bp 已經設定 url_prefix='/admin/canteens'，這裡無需再設定
     app.register_blueprint(meal_bp) # 由於 meal_bp 已經設定 url 
     app.register_blueprint(public_bp) # 由於 public_bp 已經設定 url_prefix='/public'，這裡無需再設定   
     app.register_blueprint(order_bp) # 由於 order_bp 已經設定 url_prefix='/orders'，這裡無需再設定
+    app.register_blueprint(report_bp) # 由於 report_bp 已經設定 url_prefix='/orders/reports'，這裡無需再設定
+    app.register_blueprint(setting_bp) # 由於 setting_bp 已經設定 url_prefix='/admin/settings'，這裡無需再設定
+    if app.config.get('METRICS_ENABLED', False):
+        app.register_blueprint(metrics_bp) # 指標端點 /metrics (需 METRICS_TOKEN 或 METRICS_ALLOWED_IPS，見 api/metrics.py)
+
+    # 註冊管理用 CLI 指令 (例如 flask rebuild-order-summary)
+    from .commands import register_commands
+    register_commands(app)
+    # 截止時間凍結每日訂單快照的行程內排程 (FREEZE_SCHEDULER_ENABLED；亦可改用 cron 執行 flask freeze-orders)
+    from .services.scheduler import start_freeze_scheduler
+    start_freeze_scheduler(app)
 
     # ===============================================
     # ❗ 首次展示：定義一個根目錄路由 (Route)
@@ -55,4 +95,8 @@ def create_app(config_class=Config):
     def hello():
         return {"data": "This is another test endpoint."}
 
+    # 記錄啟動耗時 (見 /metrics 的 mealreg_app_startup_seconds)
+    from .services.metrics import record_startup
+    record_startup(app, time.perf_counter() - started)
+
     return app
\ No newline at end of file
@@ -3,13 +3,22 @@
 from apiflask import APIBlueprint, Schema, abort
 from apiflask.fields import String, Integer, Boolean
 from apiflask.validators import Length, OneOf
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from datetime import timedelta
+import logging
+from flask import current_app, request
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, current_user, get_jwt, get_jwt_identity
 
 from ..extensions import db # 引入 db
+from ..log import get_logger, log_event
 from ..models.user import User # 引入 User 模型
+from ..services.passwords import PasswordPoolBusy
+from ..services.throttle import check_login_throttle
+from ..services.token_store import revoke_token
+from ..services.user_cache import user_claims
 
 # 建立藍圖實例 (所有路由前綴為 /auth)
 auth_bp = APIBlueprint('auth', __name__, url_prefix='/auth')
+logger = get_logger(__name__)
 
 # ==================================
 # A. 輸入結構：登入請求 (Request Body)
@@ -47,9 +56,40 @@ class TokenOut(Schema):
     expires_in = Integer(
         metadata={'description': 'Access Token 有效秒數'}
     )
+    refresh_token = String(
+        metadata={'description': 'JWT 刷新令牌 (用於 /auth/refresh 換取新的 Access Token，不需重新輸入密碼)'}
+    )
+    refresh_expires_in = Integer(
+        metadata={'description': 'Refresh Token 有效秒數'}
+    )
 
     # 這裡也可以根據需求加入用戶基本資訊
 
+def _expires_seconds(key, default):
+    """將 JWT_*_TOKEN_EXPIRES 設定 (timedelta / 秒數 / False) 轉為秒數；False 代表不過期，回傳 0"""
+    value = current_app.config.get(key, default)
+    if isinstance(value, timedelta):
+        return int(value.total_seconds())
+    return int(value) if value else 0
+
+
+def _access_token_out(user, refresh=True):
+    """建立 Token 回應；refresh=False 時只發行新的 Access Token"""
+    identity = str(user.id) # ❗ 修正：將 User ID 轉為字串---"msg": "Subject must be a string"
+    # additional_claims: 若啟用 JWT_EMBED_ADMIN_CLAIM，將 is_admin 嵌入 Token，權限檢查不需再查詢資料庫
+    claims = user_claims(user)
+    out = {
+        'access_token': create_access_token(identity=identity, additional_claims=claims),
+        'token_type': 'Bearer',
+        # 秒數取自 app.config 的 JWT_ACCESS_TOKEN_EXPIRES (flask_jwt_extended 預設 15 分鐘)
+        'expires_in': _expires_seconds('JWT_ACCESS_TOKEN_EXPIRES', timedelta(minutes=15))
+    }
+    if refresh:
+        out['refresh_token'] = create_refresh_token(identity=identity, additional_claims=claims)
+        out['refresh_expires_in'] = _expires_seconds('JWT_REFRESH_TOKEN_EXPIRES', timedelta(days=30))
+    return out
+
+
 # ==================================
 # C. 登入路由 (Login Endpoint)
 # ==================================
@@ -57,31 +97,71 @@ class TokenOut(Schema):
 @auth_bp.input(LoginIn) # 應用輸入結構
 @auth_bp.output(TokenOut, status_code=200) # 應用輸出結構
 def login(json_data):
-    for x in json_data:
-        print(f"-> Received login data: {x} = {json_data[x]}")
+    # 0. 登入節流：在查詢用戶與計算密碼雜湊之前先檢查嘗試次數
+    retry_after = check_login_throttle(json_data['username'], request.remote_addr)
+    if retry_after:
+        log_event(logger, 'login_throttled', logging.WARNING, username=json_data['username'], remote_addr=request.remote_addr)
+        abort(429, message="登入嘗試次數過多，請稍後再試。", headers={'Retry-After': str(retry_after)})
 
     # 1. 查找用戶
     user = User.query.filter_by(username=json_data['username']).first()
     
     # 2. 驗證用戶名和密碼
-    if user is None or not user.check_password(json_data['password']):
+    try:
+        password_ok = user is not None and user.check_password(json_data['password'])
+    except PasswordPoolBusy:
+        # 驗證池已滿：登入尖峰時請客戶端稍後重試，避免雜湊運算拖垮其他 API
+        abort(503, message="登入人數過多，請稍後再試。", headers={'Retry-After': '2'})
+    if not password_ok:
+        log_event(logger, 'login_failed', username=json_data['username'], remote_addr=request.remote_addr)
         # 使用 APIFlask 的 abort 拋出標準錯誤
         abort(401, message="用戶名或密碼錯誤。") 
 
-    # 3. 登入成功：創建 JWT Access Token
+    # 雜湊設定已變更時，趁登入成功 (持有明文密碼) 升級儲存的雜湊
+    if user.password_needs_rehash():
+        user.set_password(json_data['password'])
+        db.session.commit()
+
+    # 3. 登入成功：創建 JWT Access Token 與 Refresh Token
     # identity 參數是儲存在 Token 裡面的用戶標識 (通常是 User ID)
-    print("-> User authenticated successfully.", f"User ID: {user.id}, Username: {user.username}")
-    # access_token = create_access_token(identity=user.id)
-    access_token = create_access_token(identity=str(user.id))  # ❗ 修正：將 User ID 轉為字串---"msg": "Subject must be a string"   
+    log_event(logger, 'login_success', user_id=user.id, username=user.username)
     
     # 4. 回傳 Token
-    return {
-        'access_token': access_token,
-        'token_type': 'Bearer',
-        # 這裡的秒數應該從 app.config.JWT_ACCESS_TOKEN_EXPIRES 取得，
-        # 為了簡化，我們先硬編碼一個值
-        'expires_in': 1800 
-    }
+    return _access_token_out(user)
+
+
+# ==================================
+# C-1. 刷新路由 (Refresh Endpoint)
+# ==================================
+@auth_bp.post('/refresh')
+@jwt_required(refresh=True) # ❗ 只接受 Refresh Token
+@auth_bp.output(TokenOut, status_code=200)
+def refresh():
+    """
+    以 Refresh Token 換取新的 Access Token (不驗證密碼，不需計算密碼雜湊)。
+    Refresh Token 有效期很長，因此每次刷新都重新讀取用戶：不使用 Token 內嵌的 is_admin，
+    權限被調降的用戶在下一個 Access Token 就生效，已刪除的用戶無法再刷新。
+    """
+    user = db.session.get(User, int(get_jwt_identity()))
+    if user is None:
+        abort(401, message="用戶不存在。")
+    return _access_token_out(user, refresh=False)
+
+
+# ==================================
+# C-2. 登出路由 (Logout Endpoint)
+# ==================================
+@auth_bp.post('/logout')
+@jwt_required(verify_type=False) # Access Token 或 Refresh Token 皆可
+@auth_bp.output(Schema(), status_code=204)
+@auth_bp.doc(responses={501: {'description': '未啟用 Token 撤銷 (JWT_REVOCATION_ENABLED)，Token 在過期前仍然有效'}})
+def logout():
+    """撤銷目前使用的 Token (需啟用 JWT_REVOCATION_ENABLED；登出裝置時請送出 Refresh Token)"""
+    if not current_app.config.get('JWT_REVOCATION_ENABLED', False):
+        # 未啟用撤銷時無法讓 Token 失效；明確回報，避免客戶端誤以為已登出
+        abort(501, message="伺服器未啟用 Token 撤銷，Token 在過期前仍然有效；請由客戶端刪除 Token。")
+    revoke_token(get_jwt())
+    return ''
 
 # ==================================
 # D. 測試路由 (Protected Endpoint)
@@ -89,11 +169,10 @@ def login(json_data):
 @auth_bp.get('/protected')
 @jwt_required() # ❗ 應用 JWT 驗證保護
 def protected():
-    # 獲取 Token 中儲存的身份資訊 (User ID)
-    current_user_id = get_jwt_identity()
-    user = db.get_or_404(User, current_user_id) # 查找用戶
-    print(f"-> Protected endpoint accessed by user ID: {current_user_id}")
-    print(f"-> User details: {user}")
+    # 獲取當前用戶 (由 user_lookup_loader 載入，見 services/user_cache.py)
+    user = current_user
+    current_user_id = user.id
+    log_event(logger, 'protected_access', logging.DEBUG, user_id=current_user_id)
     
     return {
         'message': f'成功訪問！歡迎用戶 ID: {current_user_id} ({user.username})',
@@ -8,7 +8,9 @@ from flask import jsonify
 
 from ..extensions import db
 from ..models.canteen import Canteen
+from ..services.pagination import PageIn, decode_cursor, page_size, paginate
 from .decorators import admin_required
+from ..services.menu_cache import invalidate_menu_cache
 
 # 創建藍圖，前綴為 /admin
 canteen_bp = APIBlueprint('canteen', __name__, url_prefix='/admin/canteens', tag='總務管理-餐廳')
@@ -59,17 +61,27 @@ def create_canteen(json_data):
     
     db.session.add(canteen)
     db.session.commit()
+    invalidate_menu_cache() # 菜單內容已變動，清除公開菜單快取
     
     return canteen
 
 # 2. GET: 獲取所有餐廳列表
 @canteen_bp.get('/')
+@canteen_bp.input(PageIn, location='query')
 @canteen_bp.output(CanteenOut(many=True))
 @admin_required() # ❗ 總務人員權限檢查
-def get_canteens():
-    # 這裡我們讓總務人員看到所有餐廳，包含不活躍的
-    canteens = db.session.execute(db.select(Canteen).order_by(Canteen.id)).scalars().all()
-    return canteens
+def get_canteens(query_data):
+    # 這裡我們讓總務人員看到所有餐廳，包含不活躍的 (按 ID 排序，keyset 分頁；下一頁游標見回應標頭 X-Next-Cursor)
+    limit = page_size(query_data)
+    stmt = db.select(Canteen).order_by(Canteen.id).limit(limit + 1)
+    if query_data.get('cursor'):
+        (cursor_id,) = decode_cursor(query_data['cursor'], int)
+        stmt = stmt.where(Canteen.id > cursor_id)
+
+    canteens, headers = paginate(
+        db.session.execute(stmt).scalars().all(), limit, key=lambda canteen: (canteen.id,)
+    )
+    return canteens, headers
 
 # 3. GET: 獲取單個餐廳詳情
 @canteen_bp.get('/<int:canteen_id>')
@@ -85,14 +97,15 @@ def get_canteen(canteen_id):
 @admin_required() # ❗ 總務人員權限檢查
 @canteen_bp.input(CanteenIn(partial=True)) # partial=True 允許部分更新
 @canteen_bp.output(CanteenOut)
-def update_canteen(canteen_id, data):
+def update_canteen(canteen_id, json_data):
     canteen = db.get_or_404(Canteen, canteen_id)
 
     # 更新欄位
-    for key, value in data.items():
+    for key, value in json_data.items():
         setattr(canteen, key, value)
     
     db.session.commit()
+    invalidate_menu_cache()
     return canteen
 
 # 5. DELETE: 刪除餐廳
@@ -109,4 +122,5 @@ def delete_canteen(canteen_id):
     
     db.session.delete(canteen)
     db.session.commit()
+    invalidate_menu_cache()
     return '' # 204 響應不需要內容
\ No newline at end of file
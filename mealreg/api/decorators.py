@@ -3,10 +3,10 @@
 # 我們需要一個自定義的裝飾器 (@admin_required()) 來檢查當前 JWT token 攜帶的用戶 ID 是否為 is_admin=True。
 
 from functools import wraps
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask import current_app, g
+from flask_jwt_extended import current_user, jwt_required
 from apiflask import abort
-from ..extensions import db
-from ..models.user import User
+from ..extensions import wrote_recently
 
 def admin_required():
     """
@@ -16,15 +16,12 @@ def admin_required():
         @wraps(fn)
         @jwt_required() # 確保用戶已登入
         def decorator(*args, **kwargs):
-            # 1. 獲取當前用戶 ID
-            current_user_id = get_jwt_identity()
+            # 1. 取得當前用戶
+            # current_user 由 user_lookup_loader 載入 (見 services/user_cache.py)：
+            # 每個請求只載入一次，且優先使用快取或 Token 內的 is_admin 聲明，不再每次查詢 user 表
+            user = current_user
             
-            # 2. 根據 ID 查找用戶
-            # user = db.get_or_404(User, current_user_id, message="用戶不存在") # 原始程式碼 (錯誤):
-            # 修改後 (正確): 有些版本的 SQLAlchemy 不支援 message 參數
-            user = db.get_or_404(User, current_user_id, description="用戶不存在")
-            
-            # 3. 檢查是否為管理員
+            # 2. 檢查是否為管理員
             if not user.is_admin:
                 # 拋出 403 Forbidden 錯誤
                 abort(403, message="權限不足，此操作需要總務人員權限。")
@@ -32,4 +29,20 @@ def admin_required():
             # 如果通過檢查，則執行原函數
             return fn(*args, **kwargs)
         return decorator
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+
+def read_replica():
+    """
+    自定義裝飾器：將此端點的查詢送到唯讀副本 (見 extensions.py 的 RoutingSession)。
+    只用於純讀取的端點；放在 @jwt_required() / @admin_required() 之下。
+    目前用戶在 READ_YOUR_WRITES_SECONDS 內寫入過時仍使用主資料庫，確保看得到自己剛下的訂單。
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            if not wrote_recently():
+                g.db_use_replica = True
+            return current_app.ensure_sync(fn)(*args, **kwargs)
+        return decorator
+    return wrapper
@@ -7,8 +7,16 @@ from apiflask.validators import Length, Range
 
 from ..extensions import db
 from ..models.canteen import Canteen
-from ..models.meal import Meal
-from .decorators import admin_required
+from ..models.meal import Meal, MealRevision
+from ..models.order import Order
+from sqlalchemy import and_, delete, exists, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from ..services.pagination import PageIn, decode_cursor, page_size, paginate
+from .decorators import admin_required, read_replica
+from ..services.menu_cache import invalidate_menu_cache
+from ..services.meal_revisions import record_revision
+from ..services.fast_json import RowEncoder, cents_to_yuan, fast_json_enabled
 
 # 創建藍圖，前綴為 /admin
 meal_bp = APIBlueprint('meal', __name__, url_prefix='/admin/meals', tag='總務管理-菜單')
@@ -50,6 +58,15 @@ class MealOut(Schema):
     created_at = String(metadata={'description': '創建時間'})
 
 
+# 便當列表查詢的欄位 (已 JOIN 餐廳名稱)；meal_row_to_out 與快速序列化共用
+MEAL_LIST_COLUMNS = (
+    Meal.id, Meal.name, Meal.price, Meal.canteen_id,
+    Canteen.name.label('canteen_name'), Meal.is_active, Meal.created_at
+)
+# 由上述欄位直接輸出 MealOut 格式的 JSON (見 services/fast_json.py)
+MEAL_ENCODER = RowEncoder(MealOut, [column.key for column in MEAL_LIST_COLUMNS], {'price': cents_to_yuan})
+
+
 # --- CRUD 路由定義 ---
 
 # 協助將 Meal 物件轉為輸出格式
@@ -66,6 +83,18 @@ def meal_to_out(meal):
         'created_at': meal.created_at.isoformat() if meal.created_at else None
     }
 
+def meal_row_to_out(row):
+    """將查詢結果列 (已 JOIN 餐廳名稱) 轉換為輸出格式"""
+    return {
+        'id': row.id,
+        'name': row.name,
+        'price': row.price / 100.0,
+        'canteen_id': row.canteen_id,
+        'canteen_name': row.canteen_name,
+        'is_active': row.is_active,
+        'created_at': row.created_at.isoformat() if row.created_at else None
+    }
+
 # 1. POST: 新增便當
 @meal_bp.post('/')
 @admin_required() 
@@ -84,53 +113,99 @@ def create_meal(json_data):
     # 創建 Meal 實例    
     meal = Meal(**json_data)
     db.session.add(meal)
+    db.session.flush()
+    record_revision(meal) # 建立第一個菜單版本 (訂單參照版本的名稱與價格)
     db.session.commit()
+    invalidate_menu_cache() # 菜單內容已變動，清除公開菜單快取
     
     return meal_to_out(meal)
 
 # 2. GET: 獲取所有便當列表 (或依餐廳過濾)
 @meal_bp.get('/')
 @admin_required() 
+@read_replica() # 純讀取：查詢送到唯讀副本
+@meal_bp.input(PageIn, location='query')
 @meal_bp.output(MealOut(many=True))
-def get_meals():
-    # 總務人員查看所有便當
-    meals = db.session.execute(db.select(Meal).order_by(Meal.canteen_id, Meal.id)).scalars().all()
-    return [meal_to_out(meal) for meal in meals]
+def get_meals(query_data):
+    """總務人員查看所有便當 (按餐廳、ID 排序，keyset 分頁；下一頁游標見回應標頭 X-Next-Cursor)"""
+    limit = page_size(query_data)
+
+    # 以 JOIN 一次取得餐廳名稱 (避免每個便當各查一次 meal.canteen)
+    stmt = (
+        select(*MEAL_LIST_COLUMNS)
+        .join(Canteen, Meal.canteen_id == Canteen.id)
+        .order_by(Meal.canteen_id, Meal.id)
+        .limit(limit + 1)
+    )
+    if query_data.get('cursor'):
+        cursor_canteen_id, cursor_id = decode_cursor(query_data['cursor'], int, int)
+        stmt = stmt.where(or_(
+            Meal.canteen_id > cursor_canteen_id,
+            and_(Meal.canteen_id == cursor_canteen_id, Meal.id > cursor_id)
+        ))
+
+    meals, headers = paginate(
+        db.session.execute(stmt).all(), limit, key=lambda row: (row.canteen_id, row.id)
+    )
+    if fast_json_enabled():
+        return MEAL_ENCODER.response(meals, headers)
+    return [meal_row_to_out(meal) for meal in meals], headers
 
 # 3. PUT/PATCH: 更新便當
 @meal_bp.put('/<int:meal_id>')
 @admin_required()
 @meal_bp.input(MealIn(partial=True))
 @meal_bp.output(MealOut)
-def update_meal(meal_id, data):
+def update_meal(meal_id, json_data):
     meal = db.get_or_404(Meal, meal_id)
 
     # 檢查 canteen_id 是否存在 (如果傳入)
-    if 'canteen_id' in data:
-        db.get_or_404(Canteen, data['canteen_id'], message="所屬餐廳不存在")
+    if 'canteen_id' in json_data:
+        db.get_or_404(Canteen, json_data['canteen_id'], description="所屬餐廳不存在")
 
     # 轉換價格 (如果傳入)
-    if 'price' in data:
-        data['price'] = int(data['price'] * 100)
+    if 'price' in json_data:
+        json_data['price'] = int(json_data['price'] * 100)
         
-    for key, value in data.items():
+    # 名稱或價格變動時建立新的菜單版本；既有訂單仍參照原本的版本
+    revised = any(key in json_data and json_data[key] != getattr(meal, key) for key in ('name', 'price'))
+    for key, value in json_data.items():
         setattr(meal, key, value)
+    if revised:
+        record_revision(meal)
     
     db.session.commit()
+    invalidate_menu_cache()
     return meal_to_out(meal)
 
 # 4. DELETE: 刪除便當
 @meal_bp.delete('/<int:meal_id>')
 @admin_required()
-# @meal_bp.output(status_code=204)  # 錯誤的寫法，會導致 500 錯誤
-@meal_bp.output(status_code=204, schema=None)  # ✅ 正確的寫法 (204 No Content 代表成功刪除)
-# status_code=204: 告訴客戶端操作成功，但沒有內容 (No Content)。
-# schema=None: 告訴 @output 裝飾器：不需要序列化 (serialize) 任何數據，因為響應體 (response body) 將是空的。這樣就滿足了裝飾器對 schema 參數的要求，從而解決了 TypeError。
-
-
+@meal_bp.output({}, status_code=204) # 204 No Content：空的輸出 Schema，回應不需要內容
+@meal_bp.doc(responses={409: {'description': '便當已有訂單，無法刪除 (請改為停用)'}})
 def delete_meal(meal_id):
+    """
+    刪除從未被訂購過的便當。便當版本是不可變的，已有訂單參照時不可刪除 (回傳 409)，
+    請改以 PUT 設定 is_active=False 停用。
+    """
     meal = db.get_or_404(Meal, meal_id)
-    
-    db.session.delete(meal)
-    db.session.commit()
-    return ''
\ No newline at end of file
+    conflict = f"便當 '{meal.name}' 已有訂單，無法刪除；請改為停用 (is_active=False)。"
+
+    # 沒有任何訂單參照的版本才隨便當一起移除 (meal_revision.meal_id 參照 meal)。
+    # 「沒有訂單」的條件寫在 DELETE 本身，檢查與刪除是同一條語句，不會與同時進行的訂購交錯
+    no_orders = ~exists().where(Order.meal_id == meal_id)
+    try:
+        db.session.execute(delete(MealRevision).where(MealRevision.meal_id == meal_id, no_orders))
+        deleted = db.session.execute(
+            delete(Meal).where(Meal.id == meal_id, no_orders).execution_options(synchronize_session=False)
+        ).rowcount
+        if deleted:
+            db.session.commit()
+    except IntegrityError:
+        # 外鍵阻擋 (刪除期間剛好有人訂購了這個便當)
+        deleted = 0
+    if not deleted:
+        db.session.rollback()
+        abort(409, message=conflict)
+    invalidate_menu_cache()
+    return ''
@@ -0,0 +1,33 @@
+# mealreg/api/metrics.py
+# Prometheus 指標輸出端點 (METRICS_ENABLED = True 時註冊)
+# 指標包含各端點的請求數、錯誤數與登入節流次數，不對外公開：
+# - 設定 METRICS_TOKEN 時，抓取端需帶 Authorization: Bearer <METRICS_TOKEN>
+# - 或由 METRICS_ALLOWED_IPS 列出的來源位址抓取 (例如 Prometheus 所在主機；位於反向代理之後時請改用 Token)
+# 兩者皆未設定時一律拒絕。
+
+import hmac
+
+from apiflask import APIBlueprint, abort
+from flask import current_app, request
+
+from ..extensions import db
+from ..services.metrics import registry, render_runtime
+
+# 創建藍圖，路徑為 /metrics (供 Prometheus 抓取)
+metrics_bp = APIBlueprint('metrics', __name__, tag='系統監控')
+
+
+@metrics_bp.before_request
+def check_metrics_access():
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+        return None
+    if request.remote_addr in current_app.config.get('METRICS_ALLOWED_IPS', ()):
+        return None
+    abort(401 if token else 403, message="無權讀取指標。")
+
+
+@metrics_bp.get('/metrics')
+@metrics_bp.doc(summary='端點效能指標', description='Prometheus 文字格式：各端點的請求數、延遲、SQL 數量與 DB 時間，以及啟動耗時與連線池狀態 (需 METRICS_TOKEN 或 METRICS_ALLOWED_IPS)')
+def get_metrics():
+    return current_app.response_class(registry.render() + render_runtime(db.engines), mimetype='text/plain; version=0.0.4')
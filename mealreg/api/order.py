@@ -1,23 +1,26 @@
 # mealreg/api/order.py
 # 這個 API 將允許任何已登入的員工選擇當天可用的便當，並將訂購記錄寫入 order_record 資料庫表格。
 
-from datetime import date, time, datetime
+from datetime import date, datetime, timedelta
 from apiflask import APIBlueprint, Schema, abort
-from apiflask.fields import Integer, String, Float, Boolean, DateTime
-from apiflask.validators import Range
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from ..api.decorators import admin_required
-
-from apiflask.fields import Integer, String, Float, Boolean, DateTime, List, Nested
+from apiflask.fields import Integer, String, Float, Boolean, DateTime, Date, List, Nested
 # 雖然 list 是 Python 的內建型別，但在定義 Marshmallow/APIFlask Schema 欄位時，必須使用從 apiflask.fields 匯入的 List (大寫 L)。
+from apiflask.validators import Range, Length
+from flask_jwt_extended import jwt_required, current_user
+from ..api.decorators import admin_required, read_replica
 
 from ..extensions import db
-from ..models.user import User
-from ..models.meal import Meal
+from ..models.meal import MealRevision
 from ..models.order import Order
-from ..models.canteen import Canteen  # 用於檢查餐廳是否活躍
-from ..models.setting import Setting  # 用於截止時間設定
-from sqlalchemy import func, select   # ❗ 匯入 func 函式 (用於 GROUP BY 和 SUM)
+from ..services.settings import get_setting  # 用於截止時間設定
+from sqlalchemy import and_, func, or_, select, update   # ❗ 匯入 func 函式 (用於 GROUP BY 和 SUM)
+from sqlalchemy.exc import IntegrityError
+from ..models.order_summary import OrderDailySummary
+from ..services.order_summary import apply_summary_deltas, summary_deltas
+from ..services.snapshots import frozen_dates, frozen_header, frozen_message, meal_totals_stmt
+from ..services.fast_json import RowEncoder, cents_to_yuan, fast_json_enabled
+from ..services.pagination import PageIn, decode_cursor, page_size, paginate
+from ..services.ordering import load_meal_map, check_meal, check_order_date, place_orders_bulk, STATUS_CREATED, STATUS_CONFLICT
 
 # 1. 員工訂單藍圖 (前綴 /orders),前綴為 /orders
 order_bp = APIBlueprint('order', __name__, url_prefix='/orders', tag='員工-訂單')
@@ -32,6 +35,7 @@ class OrderIn(Schema):
         validate=Range(min=1), 
         metadata={'description': '欲訂購的便當 ID'}
     )
+    order_date = Date(required=False, metadata={'description': '訂購日期 (YYYY-MM-DD)，未填則為今天；可預訂未來日期'})
 
 # 2. 輸出 Schema：單筆訂單詳情
 class OrderOut(Schema):
@@ -68,15 +72,106 @@ class OrderSummaryOut(Schema):
     )
 
 
+# 4. 輸入 Schema：批次訂購 (POST /orders/batch)
+class BatchOrderItemIn(Schema):
+    user_id = Integer(required=True, validate=Range(min=1), metadata={'description': '訂購人 ID'})
+    meal_id = Integer(required=True, validate=Range(min=1), metadata={'description': '欲訂購的便當 ID'})
+    order_date = Date(required=False, metadata={'description': '訂購日期 (YYYY-MM-DD)，未填則為今天'})
+
+class BatchOrderIn(Schema):
+    orders = List(
+        Nested(BatchOrderItemIn),
+        required=True,
+        validate=Length(min=1, max=1000),
+        metadata={'description': '批次訂購項目列表 (一次最多 1000 筆)'}
+    )
+
+# 5. 輸出 Schema：批次訂購結果
+class BatchOrderResultOut(Schema):
+    index = Integer(metadata={'description': '對應輸入列表的索引'})
+    user_id = Integer()
+    meal_id = Integer()
+    order_date = String(metadata={'description': '訂購日期 (YYYY-MM-DD)'})
+    status = String(metadata={'description': '結果: created (成功) / conflict (當天已訂購) / invalid (用戶或便當無效)'})
+    order_id = Integer(allow_none=True, metadata={'description': '新訂單 ID (僅 created)'})
+    message = String(allow_none=True, metadata={'description': '失敗原因'})
+
+class BatchOrderOut(Schema):
+    created = Integer(metadata={'description': '成功筆數'})
+    conflicts = Integer(metadata={'description': '重複訂購筆數'})
+    invalid = Integer(metadata={'description': '無效筆數'})
+    results = List(Nested(BatchOrderResultOut), metadata={'description': '逐筆結果'})
+
+# 5-1. 輸入 Schema：員工預訂多日 (POST /orders/book)
+class BookOrderItemIn(Schema):
+    order_date = Date(required=True, metadata={'description': '訂購日期 (YYYY-MM-DD)'})
+    meal_id = Integer(required=True, validate=Range(min=1), metadata={'description': '欲訂購的便當 ID'})
+
+class BookOrdersIn(Schema):
+    orders = List(
+        Nested(BookOrderItemIn),
+        required=True,
+        validate=Length(min=1, max=31),
+        metadata={'description': '預訂項目列表 (每天一筆，例如一整週)'}
+    )
+
+# 5-2. 查詢參數與輸出：訂餐行事曆 (GET /orders/calendar)
+class CalendarIn(Schema):
+    start_date = Date(metadata={'description': '起始日期 (YYYY-MM-DD)，未填則為本週一'})
+    days = Integer(load_default=7, validate=Range(min=1, max=31), metadata={'description': '天數 (預設 7)'})
+
+class CalendarDayOut(Schema):
+    order_date = String(metadata={'description': '日期 (YYYY-MM-DD)'})
+    weekday = Integer(metadata={'description': '星期 (1=週一 ... 7=週日)'})
+    cutoff_at = DateTime(metadata={'description': '該日訂購/取消的截止時間'})
+    is_open = Boolean(metadata={'description': '目前是否仍可訂購或取消'})
+    order = Nested(OrderOut, allow_none=True, metadata={'description': '當天的訂單 (未訂購為 null)'})
+
+# 6. 查詢參數：我的訂單 (分頁 + 日期篩選)
+class MyOrdersIn(PageIn):
+    start_date = Date(metadata={'description': '起始日期 (YYYY-MM-DD，含)'})
+    end_date = Date(metadata={'description': '結束日期 (YYYY-MM-DD，含)'})
+
+# 7. 輸入 Schema：批次結算 (PUT /orders/paid)
+class SettleIn(Schema):
+    order_ids = List(
+        Integer(validate=Range(min=1)),
+        validate=Length(min=1, max=10000),
+        metadata={'description': '指定要結算的訂單 ID 列表'}
+    )
+    user_id = Integer(validate=Range(min=1), metadata={'description': '只結算此用戶的訂單 (需搭配日期區間)'})
+    start_date = Date(metadata={'description': '結算起始日期 (YYYY-MM-DD，含)'})
+    end_date = Date(metadata={'description': '結算結束日期 (YYYY-MM-DD，含)'})
+
+# 8. 輸出 Schema：批次結算結果
+class SettleOut(Schema):
+    settled_orders = Integer(metadata={'description': '本次標記為已繳款的訂單數'})
+    total_amount_cents = Integer(metadata={'description': '本次結算總金額 (分)'})
+    total_amount = Float(metadata={'description': '本次結算總金額 (元)'})
+
 
 # --- 路由定義 ---
-def order_to_out(order):
-    """將 Order 模型物件轉換為適合輸出的字典格式，並將價格快照轉為元"""
+
+# 訂單輸出所需的欄位 (需 JOIN meal_revision)；我的訂單、訂餐行事曆共用
+ORDER_OUT_COLUMNS = (
+    Order.id, Order.user_id, MealRevision.name.label('meal_name'), MealRevision.price.label('price'),
+    Order.is_paid, Order.order_date, Order.created_at
+)
+# 由上述欄位直接輸出 OrderOut 格式的 JSON (見 services/fast_json.py)
+ORDER_ENCODER = RowEncoder(OrderOut, [column.key for column in ORDER_OUT_COLUMNS], {'price': cents_to_yuan})
+
+def order_to_out(order, revision=None):
+    """
+    將訂單轉換為適合輸出的字典格式，並將訂購價格轉為元。
+    order 可為查詢列 (已 JOIN 便當版本的 meal_name / price) 或 Order 物件；
+    剛建立的訂單可由 revision (具有 name / price，例如 load_meal_map 的列) 提供名稱與價格，避免再查詢版本。
+    """
+    name, price = (revision.name, revision.price) if revision is not None else (order.meal_name, order.price)
     return {
         'id': order.id,
         'user_id': order.user_id,
-        'meal_name': order.meal_name_snapshot,
-        'price': order.price_snapshot / 100.0,
+        'meal_name': name,
+        'price': price / 100.0,
         'is_paid': order.is_paid,
         'order_date': order.order_date.isoformat(),
         'created_at': order.created_at
@@ -87,78 +182,222 @@ def order_to_out(order):
 @order_bp.input(OrderIn)
 @order_bp.output(OrderOut, status_code=201)
 def place_order(json_data):
-    """員工下訂單：選擇當日便當"""
-    user_id = get_jwt_identity()
-    meal_id = json_data['meal_id']
-    today = date.today()
+    """員工下訂單：選擇當日便當，或預訂未來日期 (每人每天一份，各日期依截止時間檢查)"""
+    order_date = json_data.get('order_date') or date.today()
+    return create_order(current_user.id, json_data['meal_id'], order_date)
 
-    # 1. 檢查用戶今天是否已經訂購
-    existing_order = Order.query.filter_by(user_id=user_id, order_date=today).first()
-    if existing_order:
-        abort(409, description=f"您今天 ({today.isoformat()}) 已經訂購過了。")
+
+def create_order(user_id, meal_id, order_date):
+    """建立一筆訂單並更新每日統計，回傳輸出用的字典；失敗時以 abort 回傳 404 / 400 / 409"""
+    # 0. 檢查該日期是否仍可訂購 (當天截止時間、可預訂天數)；已凍結的日期 (備餐清單已產生) 不可再訂購
+    if frozen_dates([order_date]):
+        abort(409, message=frozen_message(order_date))
+    error = check_order_date(order_date)
+    if error:
+        abort(400, message=error)
+
+    # 1. 以單一 JOIN 查詢同時取得便當與所屬餐廳的狀態 (原本需分別查詢 Meal 與 Canteen)
+    meal = load_meal_map([meal_id]).get(meal_id)
 
     # 2. 檢查便當是否存在且活躍
-    meal = db.get_or_404(Meal, meal_id, description="找不到指定的便當或該便當已下架。")
-    if not meal.is_active:
-        abort(400, description="該便當目前已暫停販售。")
-        
-    # 3. 檢查便當所屬餐廳是否活躍
-    # 這裡需要找到便當的餐廳 ID，並檢查餐廳的活躍狀態
-    canteen = db.get_or_404(Canteen, meal.canteen_id, description="找不到所屬餐廳。")
-    if not canteen.is_active:
-        abort(400, description=f"所屬餐廳 '{canteen.name}' 目前暫停訂購。")
+    if meal is None:
+        abort(404, message="找不到指定的便當或該便當已下架。")
 
-    # 4. 創建新的訂單，並記錄價格快照
+    # 3. 檢查便當與所屬餐廳是否活躍
+    error = check_meal(meal)
+    if error:
+        abort(400, message=error)
+
+    # 4. 創建新的訂單，並記錄訂購時的便當版本 (名稱與價格)
     new_order = Order(
         user_id=user_id,
         meal_id=meal_id,
-        meal_name_snapshot=meal.name, # 紀錄名稱快照
-        price_snapshot=meal.price,    # 紀錄價格快照 (分)
-        order_date=today,
+        meal_revision_id=meal.current_revision_id,
+        order_date=order_date,
         is_paid=False
     )
-    
+
+    # 5. 樂觀寫入：不事先查詢今天是否已訂購，直接交由 _user_day_uc 唯一約束判斷
+    #    同一用戶同時送出兩次時，也只會有一筆成功，另一筆回傳 409 (而不是 500)
     db.session.add(new_order)
-    db.session.commit()
-    
-    return order_to_out(new_order)
+    try:
+        db.session.flush()
+        # 在 commit 前先組好輸出 (commit 後屬性會過期，存取時會再多查詢一次)
+        order_out = order_to_out(new_order, meal)
+        apply_summary_deltas(summary_deltas([new_order])) # 同一交易中更新每日統計表
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        abort(409, message=f"您在 {order_date.isoformat()} 已經訂購過了。")
+
+    return order_out
+
+@order_bp.post('/batch')
+@admin_required() # ❗ 總務權限 (代整個部門/團隊訂購)
+@order_bp.input(BatchOrderIn)
+@order_bp.output(BatchOrderOut)
+def place_orders_batch(json_data):
+    """
+    批次下訂單：一次替多位員工訂購。
+    所有便當/餐廳只驗證一次 (預先載入)，新訂單以單一 bulk insert 寫入並只 commit 一次；
+    個別項目失敗 (重複訂購、便當無效) 不影響其他項目，逐筆回傳結果。
+    可補登已截止的日期；該日期已凍結時，同一個請求中會重建快照 (每日統計與備餐清單隨即反映)。
+    """
+    try:
+        results = place_orders_bulk(json_data['orders'])
+    except IntegrityError:
+        abort(409, message="批次訂購與其他訂購請求衝突，請重新送出。")
+
+    return batch_out(results)
+
+
+def batch_out(results):
+    """統計批次結果的各狀態筆數"""
+    return {
+        'created': sum(1 for r in results if r['status'] == STATUS_CREATED),
+        'conflicts': sum(1 for r in results if r['status'] == STATUS_CONFLICT),
+        'invalid': sum(1 for r in results if r['status'] not in (STATUS_CREATED, STATUS_CONFLICT)),
+        'results': results
+    }
+
+
+@order_bp.post('/book')
+@jwt_required()
+@order_bp.input(BookOrdersIn)
+@order_bp.output(BatchOrderOut)
+def book_orders(json_data):
+    """
+    員工預訂多日便當 (例如一次訂好整週)。
+    每天最多一份 (已訂購的日期回傳 conflict)；每個日期各自檢查截止時間與可預訂天數，
+    不可訂購的日期回傳 invalid，不影響其他日期。所有新訂單一次寫入。
+    """
+    items = [
+        {'user_id': current_user.id, 'meal_id': item['meal_id'], 'order_date': item['order_date']}
+        for item in json_data['orders']
+    ]
+    try:
+        results = place_orders_bulk(items, check_dates=True)
+    except IntegrityError:
+        abort(409, message="預訂與其他訂購請求衝突，請重新送出。")
+
+    return batch_out(results)
+
+
+@order_bp.get('/calendar')
+@jwt_required()
+@read_replica() # 純讀取：查詢送到唯讀副本
+@order_bp.input(CalendarIn, location='query')
+@order_bp.output(CalendarDayOut(many=True))
+def get_order_calendar(query_data):
+    """
+    訂餐行事曆：列出指定期間 (預設本週一起 7 天) 每天的截止時間、是否仍可訂購，以及自己當天的訂單。
+    """
+    today = date.today()
+    start = query_data.get('start_date') or today - timedelta(days=today.weekday())
+    end = start + timedelta(days=query_data['days'] - 1)
+    cutoff_time = get_setting('ORDER_CUTOFF_TIME')
+    booking_limit = today + timedelta(days=get_setting('ORDER_BOOKING_DAYS'))
+    now = datetime.now()
+
+    orders = {
+        row.order_date: row for row in db.session.execute(
+            select(*ORDER_OUT_COLUMNS)
+            .join(MealRevision, Order.meal_revision_id == MealRevision.id)
+            .where(Order.user_id == current_user.id, Order.order_date.between(start, end))
+        )
+    }
+
+    days = []
+    for offset in range(query_data['days']):
+        day = start + timedelta(days=offset)
+        cutoff_at = datetime.combine(day, cutoff_time)
+        order = orders.get(day)
+        days.append({
+            'order_date': day.isoformat(),
+            'weekday': day.isoweekday(),
+            'cutoff_at': cutoff_at,
+            'is_open': now <= cutoff_at and day <= booking_limit,
+            'order': order_to_out(order) if order else None,
+        })
+    return days
 
 # 實作員工查詢自己的訂單
 @order_bp.get('/mine')
 @jwt_required()
+@read_replica() # 純讀取：查詢送到唯讀副本
+@order_bp.input(MyOrdersIn, location='query')
 @order_bp.output(OrderOut(many=True))
-def get_my_orders():
-    """查詢當前用戶的所有歷史訂單"""
-    user_id = get_jwt_identity()
-    
-    # 查詢該用戶所有訂單，並按日期倒序排列
-    orders = db.session.execute(
-        db.select(Order).filter_by(user_id=user_id).order_by(Order.order_date.desc())
-    ).scalars().all()
-    
-    return [order_to_out(order) for order in orders]
+def get_my_orders(query_data):
+    """
+    查詢當前用戶的歷史訂單 (按日期倒序，keyset 分頁)。
+    還有下一頁時，回應標頭 X-Next-Cursor 會提供游標，帶入 cursor 參數即可取得下一頁。
+    """
+    limit = page_size(query_data)
+    orders, headers = paginate(
+        db.session.execute(my_orders_stmt(current_user.id, query_data, limit)).all(),
+        limit, key=lambda row: (row.order_date, row.id)
+    )
+    if fast_json_enabled():
+        return ORDER_ENCODER.response(orders, headers)
+    return [order_to_out(order) for order in orders], headers
+
+
+def my_orders_stmt(user_id, query_data, limit):
+    """我的訂單查詢 (多取一筆用於判斷下一頁)"""
+    # 只查詢輸出需要的欄位 (不建立 ORM 物件)，並按 (日期, ID) 倒序排列
+    stmt = (
+        select(*ORDER_OUT_COLUMNS)
+        .join(MealRevision, Order.meal_revision_id == MealRevision.id)
+        .where(Order.user_id == user_id)
+        .order_by(Order.order_date.desc(), Order.id.desc())
+        .limit(limit + 1)
+    )
+    if query_data.get('start_date'):
+        stmt = stmt.where(Order.order_date >= query_data['start_date'])
+    if query_data.get('end_date'):
+        stmt = stmt.where(Order.order_date <= query_data['end_date'])
+    if query_data.get('cursor'):
+        # 從上一頁最後一筆之後繼續 (日期較早，或同日期但 ID 較小)
+        cursor_date, cursor_id = decode_cursor(query_data['cursor'], date, int)
+        stmt = stmt.where(or_(
+            Order.order_date < cursor_date,
+            and_(Order.order_date == cursor_date, Order.id < cursor_id)
+        ))
+    return stmt
 
 
 @order_bp.get('/summary')
 @admin_required() # ❗ 總務權限
-@order_bp.input(Schema.from_dict({'date': String(metadata={'description': '查詢日期 (YYYY-MM-DD)', 'example': '2025-11-04'}, load_default=date.today().isoformat())}), location='query')
+@read_replica() # 純讀取：查詢送到唯讀副本
+@order_bp.input(Schema.from_dict({'date': String(metadata={'description': '查詢日期 (YYYY-MM-DD)，未填則為今天', 'example': '2025-11-04'})}), location='query')
 @order_bp.output(OrderSummaryOut)
 def get_order_summary(query_data):
     """總務人員獲取每日訂單統計總結"""
     
     # 嘗試將查詢參數的日期字串轉換為 date 物件
+    # (預設值在請求時才計算，避免使用伺服器啟動當天的日期)
     try:
-        query_date = date.fromisoformat(query_data['date'])
+        query_date = date.fromisoformat(query_data['date']) if query_data.get('date') else date.today()
     except ValueError:
-        abort(400, description="日期格式無效，請使用 YYYY-MM-DD 格式。")
+        abort(400, message="日期格式無效，請使用 YYYY-MM-DD 格式。")
 
-    # 1. 執行 GROUP BY 查詢，按便當名稱分組
-    # 這裡我們使用 SQLAlchemy Core 的 select 語句配合 func 進行聚合
-    meal_summary_stmt = select(
-        Order.meal_name_snapshot,
-        func.count(Order.id).label('count'),
-        func.sum(Order.price_snapshot).label('total_price_cents')
-    ).filter_by(order_date=query_date).group_by(Order.meal_name_snapshot)
+    # 1. 已截止的日期讀取凍結快照 (表頭即為當天總計)；未截止的日期讀取預先彙總的每日統計表 (order_daily_summary)
+    # 統計表由訂購/刪除流程同步維護，查詢量只與當天的便當種類數有關，不隨訂單歷史成長
+    header = frozen_header(query_date)
+    if header is not None:
+        meal_summary_stmt = meal_totals_stmt(query_date)
+    else:
+        # 統計表以便當版本 (整數) 為鍵，名稱與價格由版本取得，金額 = 數量 × 版本價格
+        meal_summary_stmt = select(
+            MealRevision.name,
+            OrderDailySummary.order_count,
+            OrderDailySummary.order_count * MealRevision.price
+        ).join(
+            MealRevision, OrderDailySummary.meal_revision_id == MealRevision.id
+        ).where(
+            OrderDailySummary.order_date == query_date,
+            OrderDailySummary.order_count > 0
+        ).order_by(MealRevision.name, MealRevision.id)
 
     meal_summary_results = db.session.execute(meal_summary_stmt).all()
 
@@ -204,6 +443,53 @@ def mark_order_paid(order_id):
     
     return order_to_out(order)
 
+@order_bp.put('/paid')
+@admin_required() # ❗ 總務權限
+@order_bp.input(SettleIn)
+@order_bp.output(SettleOut)
+def settle_orders(json_data):
+    """
+    總務人員批次結算：依訂單 ID 列表、用戶 + 日期區間、或僅日期區間，一次將未繳款訂單標記為已繳款。
+    以單一 UPDATE ... WHERE is_paid = false 完成，不逐筆載入訂單。
+    """
+    order_ids = json_data.get('order_ids')
+    user_id = json_data.get('user_id')
+    start_date = json_data.get('start_date')
+    end_date = json_data.get('end_date')
+
+    # 1. 組合篩選條件 (只處理尚未繳款的訂單)
+    conditions = [Order.is_paid == False]
+    if order_ids:
+        conditions.append(Order.id.in_(order_ids))
+    elif start_date and end_date:
+        if start_date > end_date:
+            abort(400, message="起始日期不可晚於結束日期。")
+        conditions.append(Order.order_date.between(start_date, end_date))
+        if user_id:
+            conditions.append(Order.user_id == user_id)
+    else:
+        abort(400, message="請提供 order_ids，或 start_date 與 end_date (可再加上 user_id)。")
+
+    # 2. 在同一交易中鎖定並計算結算金額，再以單一 UPDATE 標記已繳款
+    #    (FOR UPDATE 確保統計的訂單與實際更新的訂單一致)
+    total_amount_cents = db.session.execute(
+        select(func.coalesce(func.sum(MealRevision.price), 0))
+        .select_from(Order)
+        .join(MealRevision, Order.meal_revision_id == MealRevision.id)
+        .where(*conditions).with_for_update(of=Order)
+    ).scalar()
+    result = db.session.execute(
+        update(Order).where(*conditions).values(is_paid=True)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+    return {
+        'settled_orders': result.rowcount,
+        'total_amount_cents': total_amount_cents,
+        'total_amount': total_amount_cents / 100.0 # 轉為元
+    }
+
 @order_bp.delete('/del/<int:order_id>')
 @jwt_required()
 @order_bp.output(Schema(),status_code=204)
@@ -212,27 +498,11 @@ def delete_order(order_id):
     刪除訂單 (總務可刪除所有，員工只能刪除自己的)
     規則：必須在訂單日 設定的截止時間 (例如 12:00 PM) 前刪除。
     """
-    user_id = get_jwt_identity()
-    current_user = db.get_or_404(User, user_id)
     order = db.get_or_404(Order, order_id, description="找不到該訂單。")
     
-    # --- 1. 動態讀取截止時間設定 ---
-    cutoff_setting = Setting.query.filter_by(key='ORDER_CUTOFF_TIME').first()
-    
-    if not cutoff_setting:
-        # 如果設定不存在，使用硬編碼預設值作為備用 (例如 12:00)
-        cutoff_time = time(12, 0, 0) 
-        time_str = "12:00"
-    else:
-        # 嘗試解析儲存在資料庫中的時間字串 (例如 '12:00')
-        try:
-            hour, minute = map(int, cutoff_setting.value.split(':'))
-            cutoff_time = time(hour, minute, 0)
-            time_str = cutoff_setting.value
-        except ValueError:
-            # 解析失敗，使用硬編碼預設值
-            cutoff_time = time(12, 0, 0)
-            time_str = "12:00 (設定解析錯誤)"
+    # --- 1. 讀取截止時間設定 (由設定服務快取，通常不需查詢資料庫) ---
+    cutoff_time = get_setting('ORDER_CUTOFF_TIME')
+    time_str = cutoff_time.strftime('%H:%M')
 
     # --- 2. 時間檢查：確認是否已過當日截止時間 ---
     
@@ -244,11 +514,17 @@ def delete_order(order_id):
     if now > cutoff_datetime:
         abort(403, message=f"已超過訂單日 {time_str} 刪除截止時間，無法刪除。")
         
+    # 已凍結的日期 (例如凍結後才把截止時間往後調) 不可刪除，避免備餐清單與訂單不一致
+    if frozen_dates([order.order_date]):
+        abort(409, message=frozen_message(order.order_date))
+
     # --- 3. 權限檢查 (邏輯不變) ---
-    if not current_user.is_admin and order.user_id != user_id:
+    # current_user 由 user_lookup_loader 載入 (已快取)，不再重複查詢 user 表
+    if not current_user.is_admin and order.user_id != current_user.id:
         abort(403, message="您沒有權限刪除此訂單。您只能刪除自己的訂單。")
         
-    # --- 4. 執行刪除 (邏輯不變) ---
+    # --- 4. 執行刪除，並在同一交易中扣除每日統計 ---
+    apply_summary_deltas(summary_deltas([order], sign=-1))
     db.session.delete(order)
     db.session.commit()
     
@@ -3,9 +3,12 @@
 
 from apiflask import APIBlueprint, Schema
 from apiflask.fields import Integer, String, Boolean, Float, List, Nested
+from flask import current_app, request
+from sqlalchemy import and_, select
 from ..extensions import db
 from ..models.canteen import Canteen
 from ..models.meal import Meal
+from ..services.menu_cache import get_menu_payload
 
 # 創建藍圖，前綴為 /public
 public_bp = APIBlueprint('public', __name__, url_prefix='/public', tag='公開查詢-員工')
@@ -35,41 +38,58 @@ class CanteenMenuOut(Schema):
 
 # --- 路由定義 ---實作菜單查詢路由
 
+def build_active_menu():
+    """
+    以單一查詢組合所有活躍餐廳及其活躍便當 (避免每間餐廳各查一次的 N+1 問題)。
+    使用 LEFT OUTER JOIN，沒有任何活躍便當的餐廳仍會出現在列表中。
+    """
+    stmt = (
+        select(
+            Canteen.id, Canteen.name, Canteen.description, Canteen.is_active,
+            Meal.id, Meal.name, Meal.price
+        )
+        .outerjoin(Meal, and_(Meal.canteen_id == Canteen.id, Meal.is_active == True))
+        .where(Canteen.is_active == True)
+        .order_by(Canteen.id, Meal.id)
+    )
+
+    result = []
+    current = None
+    for canteen_id, canteen_name, description, is_active, meal_id, meal_name, price in db.session.execute(stmt):
+        # 查詢結果已按餐廳排序，餐廳 ID 改變時開始新的一組
+        if current is None or current['id'] != canteen_id:
+            current = {
+                'id': canteen_id,
+                'name': canteen_name,
+                'description': description,
+                'is_active': is_active,
+                'meals': []
+            }
+            result.append(current)
+
+        if meal_id is not None:
+            current['meals'].append({
+                'id': meal_id,
+                'name': meal_name,
+                'price': price / 100.0, # 將 "分" 轉 "元"
+            })
+
+    return CanteenMenuOut(many=True).dump(result)
+
+
 # GET: 獲取所有活躍的餐廳和菜單
 @public_bp.get('/menu')
 @public_bp.output(CanteenMenuOut(many=True))
 def get_active_menu():
     """獲取所有目前可訂購的餐廳及其菜單"""
-    
-    # 1. 查詢所有活躍的餐廳 (Canteen)
-    active_canteens = db.session.execute(
-        db.select(Canteen).filter_by(is_active=True).order_by(Canteen.id)
-    ).scalars().all()
-    
-    result = []
-    
-    for canteen in active_canteens:
-        # 2. 查詢該餐廳所有活躍的便當 (Meal)
-        active_meals = db.session.execute(
-            db.select(Meal).filter_by(canteen_id=canteen.id, is_active=True)
-            .order_by(Meal.id)
-        ).scalars().all()
-        
-        # 3. 組合數據
-        meals_list = []
-        for meal in active_meals:
-            meals_list.append({
-                'id': meal.id,
-                'name': meal.name,
-                'price': meal.price / 100.0, # 將 "分" 轉 "元"
-            })
-            
-        result.append({
-            'id': canteen.id,
-            'name': canteen.name,
-            'description': canteen.description,
-            'is_active': canteen.is_active,
-            'meals': meals_list
-        })
-        
-    return result
\ No newline at end of file
+
+    # 1. 從快取取得已序列化的菜單 (未命中時才查詢資料庫)
+    etag, body = get_menu_payload(build_active_menu)
+
+    # 2. 直接回傳 Response (略過 @output 的重複序列化)，並附上強 ETag
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache' # 允許瀏覽器快取，但每次都需以 ETag 重新驗證
+
+    # 3. 客戶端帶 If-None-Match 且內容未變時回傳 304 Not Modified
+    return response.make_conditional(request)
@@ -0,0 +1,313 @@
+# mealreg/api/report.py
+# 總務/財務報表 API：依日期區間彙總 (按用戶、按餐廳與日期/週)，在 SQL 中完成 GROUP BY，並以串流方式輸出結果
+
+from apiflask import APIBlueprint, Schema, abort
+from datetime import date
+
+from apiflask.fields import Integer, String, Float, Boolean, Date, DateTime, List, Nested
+from apiflask.validators import Range, OneOf
+from sqlalchemy import case, func, select
+
+from ..extensions import db
+from ..models.canteen import Canteen
+from ..models.meal import Meal, MealRevision
+from ..models.order import Order
+from ..models.user import User
+from ..services.snapshots import charges_range_stmt, get_production
+from ..services.streaming import csv_response, json_array_response, ndjson_response, stream_rows
+from .decorators import admin_required, read_replica
+
+# 報表藍圖，前綴為 /orders/reports
+report_bp = APIBlueprint('report', __name__, url_prefix='/orders/reports', tag='總務管理-報表')
+
+
+# --- Schema 定義 ---
+
+# 1. 查詢參數：日期區間 (共用)
+class DateRangeIn(Schema):
+    start_date = Date(required=True, metadata={'description': '起始日期 (YYYY-MM-DD，含)'})
+    end_date = Date(required=True, metadata={'description': '結束日期 (YYYY-MM-DD，含)'})
+
+# 2. 查詢參數：用戶對帳單
+class UserStatementIn(DateRangeIn):
+    user_id = Integer(validate=Range(min=1), metadata={'description': '只查詢此用戶'})
+    by_date = Boolean(load_default=False, metadata={'description': '是否按日期列出明細 (預設只按用戶彙總)'})
+
+# 3. 查詢參數：餐廳彙總
+class CanteenTotalsIn(DateRangeIn):
+    canteen_id = Integer(validate=Range(min=1), metadata={'description': '只查詢此餐廳'})
+    period = String(
+        load_default='day',
+        validate=OneOf(['day', 'week']),
+        metadata={'description': '彙總週期: day (按日) / week (按週，以週一為起始)'}
+    )
+
+# 4. 查詢參數：訂單匯出
+class OrderExportIn(Schema):
+    start_date = Date(metadata={'description': '起始日期 (YYYY-MM-DD，含)'})
+    end_date = Date(metadata={'description': '結束日期 (YYYY-MM-DD，含)'})
+    is_paid = Boolean(metadata={'description': '只匯出已繳款 (true) 或未繳款 (false) 的訂單 (僅 detail=orders)'})
+    canteen_id = Integer(validate=Range(min=1), metadata={'description': '只匯出此餐廳的訂單 (僅 detail=orders)'})
+    detail = String(
+        load_default='orders',
+        validate=OneOf(['orders', 'charges']),
+        metadata={'description': '匯出內容: orders (訂單明細) / charges (每位用戶每日應繳金額，已截止的日期讀取凍結快照)'}
+    )
+    format = String(
+        load_default='csv',
+        validate=OneOf(['csv', 'ndjson']),
+        metadata={'description': '匯出格式: csv / ndjson'}
+    )
+
+# 5. 輸出 Schema：用戶對帳單列
+class UserStatementOut(Schema):
+    user_id = Integer(metadata={'description': '用戶 ID'})
+    username = String(metadata={'description': '用戶名稱'})
+    order_date = String(allow_none=True, metadata={'description': '訂購日期 (僅 by_date=true 時提供)'})
+    order_count = Integer(metadata={'description': '訂單數'})
+    total_amount = Float(metadata={'description': '總金額 (元)'})
+    paid_amount = Float(metadata={'description': '已繳款金額 (元)'})
+    unpaid_amount = Float(metadata={'description': '未繳款金額 (元)'})
+
+# 6. 輸出 Schema：餐廳彙總列
+class CanteenTotalsOut(Schema):
+    canteen_id = Integer(metadata={'description': '餐廳 ID'})
+    canteen_name = String(metadata={'description': '餐廳名稱'})
+    period_start = String(metadata={'description': '週期起始日期 (YYYY-MM-DD)'})
+    order_count = Integer(metadata={'description': '訂單數'})
+    total_amount = Float(metadata={'description': '總金額 (元)'})
+
+
+# 7. 查詢參數：餐廳備餐清單
+class ProductionIn(Schema):
+    date = Date(metadata={'description': '訂購日期 (YYYY-MM-DD)，未填則為今天'})
+    canteen_id = Integer(validate=Range(min=1), metadata={'description': '只查詢此餐廳'})
+
+# 8. 輸出 Schema：餐廳備餐清單
+class ProductionMealOut(Schema):
+    meal_id = Integer(metadata={'description': '便當 ID'})
+    meal_name = String(metadata={'description': '便當名稱 (該便當版本的名稱)'})
+    count = Integer(metadata={'description': '訂購數量'})
+    total_price = Float(metadata={'description': '該便當總金額 (元)'})
+
+class ProductionCanteenOut(Schema):
+    canteen_id = Integer(metadata={'description': '餐廳 ID'})
+    canteen_name = String(metadata={'description': '餐廳名稱'})
+    total_orders = Integer(metadata={'description': '該餐廳總訂單數'})
+    total_amount = Float(metadata={'description': '該餐廳總金額 (元)'})
+    meals = List(Nested(ProductionMealOut), metadata={'description': '按便當分類的數量'})
+
+class ProductionOut(Schema):
+    order_date = String(metadata={'description': '訂購日期 (YYYY-MM-DD)'})
+    frozen = Boolean(metadata={'description': '是否為截止後凍結的快照 (false 表示仍可能變動)'})
+    frozen_at = DateTime(allow_none=True, metadata={'description': '凍結時間'})
+    canteens = List(Nested(ProductionCanteenOut), metadata={'description': '各餐廳的備餐清單'})
+
+
+# --- 查詢輔助 ---
+
+def _check_range(query_data):
+    if query_data['start_date'] > query_data['end_date']:
+        abort(400, message="起始日期不可晚於結束日期。")
+
+
+def _week_start(column):
+    """回傳「該日期所在週的週一」的 SQL 運算式 (依資料庫方言)"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        return func.date(column, '-6 days', 'weekday 1')
+    # MySQL / MariaDB: SUBDATE(date, WEEKDAY(date))，WEEKDAY 週一為 0
+    return func.subdate(column, func.weekday(column))
+
+
+def _iso(value):
+    # SQLite 的日期運算結果為字串，MySQL 為 date 物件
+    return value if isinstance(value, str) or value is None else value.isoformat()
+
+
+# --- 路由定義 ---
+
+@report_bp.get('/users')
+@admin_required()
+@read_replica() # 純讀取：查詢送到唯讀副本
+@report_bp.input(UserStatementIn, location='query')
+@report_bp.output(UserStatementOut(many=True))
+def get_user_statements(query_data):
+    """用戶對帳單：依日期區間彙總每位用戶的訂單數與金額 (可按日期列出明細)"""
+    _check_range(query_data)
+
+    paid_cents = func.sum(case((Order.is_paid == True, MealRevision.price), else_=0))
+    group_columns = [Order.user_id, User.username]
+    order_columns = [Order.user_id]
+    if query_data['by_date']:
+        group_columns.append(Order.order_date)
+        order_columns.append(Order.order_date)
+
+    stmt = (
+        select(
+            *group_columns,
+            func.count(Order.id).label('order_count'),
+            func.sum(MealRevision.price).label('total_cents'),
+            paid_cents.label('paid_cents')
+        )
+        .join(MealRevision, Order.meal_revision_id == MealRevision.id)
+        .join(User, Order.user_id == User.id)
+        .where(Order.order_date.between(query_data['start_date'], query_data['end_date']))
+        .group_by(*group_columns)
+        .order_by(*order_columns)
+    )
+    if query_data.get('user_id'):
+        stmt = stmt.where(Order.user_id == query_data['user_id'])
+
+    def to_dict(row):
+        return {
+            'user_id': row.user_id,
+            'username': row.username,
+            'order_date': _iso(row.order_date) if query_data['by_date'] else None,
+            'order_count': row.order_count,
+            'total_amount': row.total_cents / 100.0,
+            'paid_amount': row.paid_cents / 100.0,
+            'unpaid_amount': (row.total_cents - row.paid_cents) / 100.0
+        }
+
+    return json_array_response(stream_rows(stmt), to_dict)
+
+
+@report_bp.get('/canteens')
+@admin_required()
+@read_replica() # 純讀取：查詢送到唯讀副本
+@report_bp.input(CanteenTotalsIn, location='query')
+@report_bp.output(CanteenTotalsOut(many=True))
+def get_canteen_totals(query_data):
+    """餐廳彙總：依日期區間按餐廳 (經由 meal.canteen_id) 與日/週彙總訂單數與金額"""
+    _check_range(query_data)
+
+    period_start = (
+        _week_start(Order.order_date) if query_data['period'] == 'week' else Order.order_date
+    ).label('period_start')
+
+    stmt = (
+        select(
+            Meal.canteen_id,
+            Canteen.name.label('canteen_name'),
+            period_start,
+            func.count(Order.id).label('order_count'),
+            func.sum(MealRevision.price).label('total_cents')
+        )
+        .join(MealRevision, Order.meal_revision_id == MealRevision.id)
+        .join(Meal, Order.meal_id == Meal.id)
+        .join(Canteen, Meal.canteen_id == Canteen.id)
+        .where(Order.order_date.between(query_data['start_date'], query_data['end_date']))
+        .group_by(Meal.canteen_id, Canteen.name, period_start)
+        .order_by(period_start, Meal.canteen_id)
+    )
+    if query_data.get('canteen_id'):
+        stmt = stmt.where(Meal.canteen_id == query_data['canteen_id'])
+
+    def to_dict(row):
+        return {
+            'canteen_id': row.canteen_id,
+            'canteen_name': row.canteen_name,
+            'period_start': _iso(row.period_start),
+            'order_count': row.order_count,
+            'total_amount': row.total_cents / 100.0
+        }
+
+    return json_array_response(stream_rows(stmt), to_dict)
+
+
+# 訂單匯出欄位 (CSV 標題列與 NDJSON 鍵名一致)
+EXPORT_COLUMNS = [
+    'order_id', 'order_date', 'user_id', 'username', 'meal_id', 'meal_name',
+    'canteen_id', 'canteen_name', 'price', 'is_paid', 'created_at'
+]
+
+# 應繳金額匯出欄位 (detail=charges)
+CHARGE_COLUMNS = ['order_date', 'user_id', 'username', 'order_count', 'amount', 'frozen']
+
+
+@report_bp.get('/export')
+@admin_required()
+@read_replica() # 純讀取：查詢送到唯讀副本
+@report_bp.input(OrderExportIn, location='query')
+@report_bp.doc(responses={200: {'description': '訂單明細 (CSV 或 NDJSON 串流)'}})
+def export_orders(query_data):
+    """
+    會計匯出：直接由 order_record 查詢欄位值 (不建立 ORM 物件)，以伺服器端游標分批讀取，
+    並以 CSV / NDJSON 串流輸出；記憶體用量固定，第一筆資料會立即送出。
+    detail=charges 時匯出每位用戶每日的應繳金額：已凍結的日期直接讀取快照，不再彙總訂單。
+    """
+    if query_data['detail'] == 'charges':
+        return _export_charges(query_data)
+
+    conditions = []
+    if query_data.get('start_date'):
+        conditions.append(Order.order_date >= query_data['start_date'])
+    if query_data.get('end_date'):
+        conditions.append(Order.order_date <= query_data['end_date'])
+    if 'is_paid' in query_data:
+        conditions.append(Order.is_paid == query_data['is_paid'])
+    if query_data.get('canteen_id'):
+        conditions.append(Meal.canteen_id == query_data['canteen_id'])
+
+    stmt = (
+        select(
+            Order.id, Order.order_date, Order.user_id, User.username, Order.meal_id,
+            MealRevision.name.label('meal_name'), Meal.canteen_id, Canteen.name.label('canteen_name'),
+            MealRevision.price, Order.is_paid, Order.created_at
+        )
+        .join(MealRevision, Order.meal_revision_id == MealRevision.id)
+        .join(User, Order.user_id == User.id)
+        .join(Meal, Order.meal_id == Meal.id)
+        .join(Canteen, Meal.canteen_id == Canteen.id)
+        .where(*conditions)
+        .order_by(Order.order_date, Order.id)
+    )
+
+    def to_values(row):
+        return [
+            row.id, row.order_date.isoformat(), row.user_id, row.username, row.meal_id,
+            row.meal_name, row.canteen_id, row.canteen_name,
+            row.price / 100.0, # 轉為元
+            bool(row.is_paid),
+            row.created_at.isoformat() if row.created_at else None
+        ]
+
+    rows = stream_rows(stmt)
+    if query_data['format'] == 'ndjson':
+        return ndjson_response(rows, lambda row: dict(zip(EXPORT_COLUMNS, to_values(row))), filename='orders.ndjson')
+    return csv_response(rows, EXPORT_COLUMNS, to_values, filename='orders.csv')
+
+
+def _export_charges(query_data):
+    if 'is_paid' in query_data or query_data.get('canteen_id'):
+        abort(400, message="應繳金額匯出不支援 is_paid 與 canteen_id 篩選。")
+    if not query_data.get('start_date') or not query_data.get('end_date'):
+        abort(400, message="應繳金額匯出需指定 start_date 與 end_date。")
+    _check_range(query_data)
+
+    stmt = charges_range_stmt(query_data['start_date'], query_data['end_date'])
+
+    def to_values(row):
+        return [
+            _iso(row.order_date), row.user_id, row.username, row.order_count,
+            row.amount_cents / 100.0, # 轉為元
+            bool(row.frozen)
+        ]
+
+    rows = stream_rows(stmt)
+    if query_data['format'] == 'ndjson':
+        return ndjson_response(rows, lambda row: dict(zip(CHARGE_COLUMNS, to_values(row))), filename='charges.ndjson')
+    return csv_response(rows, CHARGE_COLUMNS, to_values, filename='charges.csv')
+
+
+@report_bp.get('/production')
+@admin_required()
+@report_bp.input(ProductionIn, location='query')
+@report_bp.output(ProductionOut)
+def get_production_list(query_data):
+    """
+    餐廳備餐清單：按 (餐廳, 便當) 列出指定日期的訂購數量。
+    截止時間過後讀取凍結的快照 (第一次查詢時凍結)，之後各餐廳重複查詢都不再重新彙總訂單。
+    """
+    return get_production(query_data.get('date') or date.today(), query_data.get('canteen_id'))
@@ -0,0 +1,59 @@
+# mealreg/api/setting.py
+# 系統設定 (Setting) 管理 API
+
+from apiflask import APIBlueprint, Schema, abort
+from apiflask.fields import String
+
+from ..services.settings import SETTINGS_REGISTRY, format_setting, get_all_settings, set_setting
+from .decorators import admin_required
+
+# 創建藍圖，前綴為 /admin/settings
+setting_bp = APIBlueprint('setting', __name__, url_prefix='/admin/settings', tag='總務管理-系統設定')
+
+# --- Schema 定義 ---
+
+# 輸入 Schema：修改設定值
+class SettingIn(Schema):
+    value = String(required=True, metadata={'description': '設定值 (依設定型別，例如時間為 HH:MM)'})
+
+# 輸出 Schema：設定詳情
+class SettingOut(Schema):
+    key = String(metadata={'description': '設定鍵'})
+    value = String(metadata={'description': '目前的設定值'})
+    type = String(metadata={'description': '設定型別 (time / int / bool / str)'})
+    description = String(metadata={'description': '設定說明'})
+
+
+def setting_to_out(key, value):
+    spec = SETTINGS_REGISTRY[key]
+    return {
+        'key': key,
+        'value': format_setting(key, value),
+        'type': spec.type,
+        'description': spec.description
+    }
+
+# --- 路由定義 ---
+
+# 1. GET: 獲取所有設定
+@setting_bp.get('/')
+@admin_required()
+@setting_bp.output(SettingOut(many=True))
+def get_settings():
+    return [setting_to_out(key, value) for key, value in get_all_settings().items()]
+
+# 2. PUT: 修改單一設定 (立即生效，其他 worker 於 SETTINGS_REFRESH_INTERVAL 秒內同步)
+@setting_bp.put('/<string:key>')
+@admin_required()
+@setting_bp.input(SettingIn)
+@setting_bp.output(SettingOut)
+def update_setting(key, json_data):
+    if key not in SETTINGS_REGISTRY:
+        abort(404, message=f"找不到設定 '{key}'。")
+
+    try:
+        value = set_setting(key, json_data['value'])
+    except (ValueError, TypeError):
+        abort(400, message=f"設定值格式無效 (型別: {SETTINGS_REGISTRY[key].type})。")
+
+    return setting_to_out(key, value)
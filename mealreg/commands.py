@@ -0,0 +1,101 @@
+# mealreg/commands.py
+# Flask CLI 指令 (執行方式: flask --app app <指令>)
+
+import click
+
+from .extensions import db
+from .services.order_summary import rebuild_summary
+from .services.meal_revisions import migrate_meal_revisions
+from .services.snapshots import freeze_closed_days, freeze_day, is_closed, refreeze_day
+
+
+# 預設帳號與設定 (flask init-db 建立；已存在時跳過)
+DEFAULT_ADMIN = {'username': 'admin', 'email': 'admin@example.com', 'password': '123456'}
+DEFAULT_EMPLOYEE = {'username': 'emp10', 'email': 'emp10@example.com.tw', 'password': 'password'}
+DEFAULT_CUTOFF_TIME = '11:00'
+
+
+def init_database(seed=True, echo=click.echo):
+    """建立資料表，並 (可選) 建立預設總務帳號、員工帳號與訂單截止時間設定；可重複執行"""
+    # 確保在 db.create_all() 之前匯入所有模型
+    from .models.canteen import Canteen
+    from .models.meal import Meal, MealRevision
+    from .models.order import Order
+    from .models.order_summary import OrderDailySummary
+    from .models.order_snapshot import CanteenProductionSnapshot, OrderDaySnapshot, UserChargeSnapshot
+    from .models.setting import Setting
+    from .models.user import User
+
+    echo("-> 嘗試創建資料庫表格...")
+    # 只有在表格不存在時才會創建
+    db.create_all()
+    echo("-> 資料庫表格創建完成。")
+    if not seed:
+        return
+
+    for account, is_admin in ((DEFAULT_ADMIN, True), (DEFAULT_EMPLOYEE, False)):
+        if User.query.filter_by(username=account['username']).first():
+            echo(f"-> 預設帳號已存在，跳過創建: {account['username']}")
+            continue
+        user = User(username=account['username'], email=account['email'], is_admin=is_admin)
+        user.set_password(account['password'])
+        db.session.add(user)
+        db.session.commit()
+        echo(f"-> 已創建預設{'總務' if is_admin else '員工'}帳號: username={user.username}, email={user.email}")
+
+    if not db.session.get(Setting, 'ORDER_CUTOFF_TIME'):
+        db.session.add(Setting(key='ORDER_CUTOFF_TIME', value=DEFAULT_CUTOFF_TIME))
+        db.session.commit()
+        echo(f"-> 初始化訂單截止時間設定: ORDER_CUTOFF_TIME = {DEFAULT_CUTOFF_TIME}")
+    else:
+        echo("-> 訂單截止時間設定已存在，跳過初始化。")
+
+
+def register_commands(app):
+    """將管理用 CLI 指令註冊到應用程式"""
+
+    @app.cli.command('init-db')
+    @click.option('--seed/--no-seed', default=True, help='是否建立預設帳號與設定')
+    def init_db(seed):
+        """建立資料表與預設資料 (部署或首次啟動前執行一次；應用程式啟動時不再做任何資料庫操作)"""
+        init_database(seed)
+
+    @app.cli.command('rebuild-order-summary')
+    @click.option('--start-date', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='起始日期 (YYYY-MM-DD，含)')
+    @click.option('--end-date', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='結束日期 (YYYY-MM-DD，含)')
+    def rebuild_order_summary(start_date, end_date):
+        """由 order_record 重新計算每日訂單統計表 (未指定日期時重建全部)"""
+        start = start_date.date() if start_date else None
+        end = end_date.date() if end_date else None
+        rows = rebuild_summary(start, end)
+        click.echo(f"-> 每日訂單統計已重建: {start or '最早'} ~ {end or '最新'}，共 {rows} 筆統計資料。")
+
+    @app.cli.command('freeze-orders')
+    @click.option('--date', 'order_date', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='只凍結此日期 (YYYY-MM-DD)')
+    @click.option('--refreeze', is_flag=True, help='刪除既有快照後重新凍結 (需搭配 --date；用於截止後補登或更正訂單)')
+    def freeze_orders(order_date, refreeze):
+        """凍結已截止日期的訂單快照 (總計、備餐清單、用戶應繳金額)；未指定日期時凍結所有尚未凍結的日期，可由 cron 在截止時間後執行"""
+        if order_date is None:
+            if refreeze:
+                raise click.UsageError('--refreeze 需搭配 --date 指定日期。')
+            frozen = freeze_closed_days()
+            click.echo(f"-> 已凍結 {len(frozen)} 個日期: {', '.join(day.isoformat() for day in frozen) or '無'}")
+            return
+        day = order_date.date()
+        if not is_closed(day):
+            raise click.ClickException(f'{day} 尚未截止，無法凍結。')
+        done = refreeze_day(day) if refreeze else freeze_day(day)
+        click.echo(f"-> {day} {'已完成凍結' if done else '已凍結過，未變更'}。")
+
+    @app.cli.command('migrate-meal-revisions')
+    def migrate_meal_revisions_command():
+        """將既有資料庫移轉為便當版本：訂單改參照 meal_revision，並重建每日統計與快照 (可重複執行)"""
+        migrate_meal_revisions()
+
+    @app.cli.command('create-indexes')
+    def create_indexes():
+        """建立模型中宣告、但現有資料表尚未建立的索引 (db.create_all() 不會替既有資料表補上索引)"""
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=db.engine, checkfirst=True)
+                click.echo(f"-> 索引已就緒: {table.name}.{index.name}")
@@ -1,7 +1,90 @@
+import time
+
+from flask import current_app, g, has_request_context, request
 from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import JWTManager
+from flask_sqlalchemy.session import Session
+from flask_jwt_extended import JWTManager, get_jwt_identity
+
+from .services.cache import TTLCache
+
+# 「最近寫入過」的標記：在 READ_YOUR_WRITES_SECONDS 內這些用戶的讀取一律走主資料庫。
+# 標記隨回應寫入短效 Cookie (READ_YOUR_WRITES_COOKIE) 由客戶端帶回，下一個請求落在其他 gunicorn worker 也看得到；
+# 行程內的 _recent_writers 只是備援 (不保存 Cookie 的客戶端只有落在同一個 worker 時才有效)。
+READ_YOUR_WRITES_COOKIE = 'mealreg_rw'
+_recent_writers = TTLCache(maxsize=10000, ttl=10)
+
+
+class RoutingSession(Session):
+    """
+    讀寫分離的 Session：
+    - 標記為唯讀的請求 (見 api/decorators.py 的 @read_replica()) 中，查詢改送到 SQLALCHEMY_BINDS 裡的
+      唯讀副本 (bind 名稱由 DB_REPLICA_BIND 設定，預設 'replica')；未設定副本時一律使用主資料庫
+    - INSERT / UPDATE / DELETE 與 flush 永遠送到主資料庫，並記錄寫入者以便之後的讀取看得到自己的寫入
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            replica_key = current_app.config.get('DB_REPLICA_BIND', 'replica')
+            replica = self._db.engines.get(replica_key) if replica_key else None
+            if replica is not None:
+                if self._flushing or getattr(clause, 'is_dml', False):
+                    _mark_recent_writer()
+                elif g.get('db_use_replica'):
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _current_identity():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        # 此請求沒有驗證 JWT
+        return None
+
+
+def _mark_recent_writer():
+    identity = _current_identity()
+    if identity is not None:
+        _recent_writers.set(identity, True, ttl=current_app.config.get('READ_YOUR_WRITES_SECONDS', 10))
+        g.db_recent_writer = identity
+
+
+def wrote_recently(identity=None):
+    """目前 (或指定) 的用戶是否在 READ_YOUR_WRITES_SECONDS 內寫入過 (副本可能尚未同步)"""
+    identity = _current_identity() if identity is None else identity
+    if identity is None:
+        return False
+    return _cookie_marks(identity) or _recent_writers.get(identity, False)
+
+
+def _cookie_marks(identity):
+    # Cookie 值為 "用戶 ID:到期時間 (epoch 秒)"；到期時間由伺服器檢查，不依賴客戶端是否遵守 Max-Age
+    marker_identity, _, expires_at = request.cookies.get(READ_YOUR_WRITES_COOKIE, '').partition(':')
+    try:
+        return marker_identity == str(identity) and float(expires_at) > time.time()
+    except ValueError:
+        return False
+
+
+def _set_recent_writer_cookie(response):
+    """本次請求有寫入時，以短效 Cookie 讓客戶端帶回標記 (竄改只會讓自己的讀取改走主資料庫)"""
+    identity = g.get('db_recent_writer')
+    if identity is not None:
+        seconds = current_app.config.get('READ_YOUR_WRITES_SECONDS', 10)
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE, f'{identity}:{time.time() + seconds:.3f}',
+            max_age=seconds,
+            httponly=True, samesite='Lax', secure=request.is_secure
+        )
+    return response
+
+
+def init_read_your_writes(app):
+    """註冊回應掛鉤：請求中有寫入時附上標記 Cookie (未設定唯讀副本時不會有標記)"""
+    app.after_request(_set_recent_writer_cookie)
+
 
-# 實例化 ORM
-db = SQLAlchemy()
+# 實例化 ORM (使用讀寫分離的 Session)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 # 實例化 JWT 管理器
-jwt = JWTManager()
\ No newline at end of file
+jwt = JWTManager()
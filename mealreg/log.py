@@ -0,0 +1,103 @@
+# mealreg/log.py
+# 結構化日誌 (JSON)：
+# - 依 LOG_LEVEL 分級，未啟用的等級在呼叫端就直接略過 (不組字串、不序列化)
+# - INFO 以下的事件可依 LOG_SAMPLE_RATE 取樣輸出 (WARNING 以上一律保留)
+# - 請求執行緒只把紀錄放進佇列 (QueueHandler)，實際寫入 stdout 由背景執行緒 (QueueListener) 負責
+# - 密碼、Token 等敏感欄位一律遮蔽，不會寫入日誌
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+# 應用程式日誌的根 logger 名稱 (各模組使用 mealreg.xxx 子 logger)
+ROOT_LOGGER = 'mealreg'
+
+# 不可寫入日誌的欄位 (比對時不分大小寫)
+SECRET_FIELDS = {'password', 'password_hash', 'token', 'access_token', 'refresh_token', 'authorization', 'secret'}
+REDACTED = '***'
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """將紀錄輸出為單行 JSON: 時間、等級、logger、事件名稱與結構化欄位"""
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': record.getMessage(),
+        }
+        payload.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """INFO 以下的紀錄依比例取樣；WARNING 以上不受影響"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or self.rate >= 1 or random.random() < self.rate
+
+
+def redact(fields):
+    """遮蔽敏感欄位的值"""
+    return {
+        key: (REDACTED if key.lower() in SECRET_FIELDS else value)
+        for key, value in fields.items()
+    }
+
+
+def get_logger(name):
+    """取得模組用的 logger (掛在 mealreg 根 logger 之下)"""
+    if not name.startswith(ROOT_LOGGER):
+        name = f'{ROOT_LOGGER}.{name}'
+    return logging.getLogger(name)
+
+
+def log_event(logger, event, level=logging.INFO, **fields):
+    """
+    記錄一個結構化事件。未啟用該等級時立即返回，欄位不會被處理。
+    例: log_event(logger, 'login_success', user_id=1)
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={'fields': redact(fields)})
+
+
+def init_logging(app):
+    """依 app.config 設定 mealreg 日誌：JSON 格式、等級、取樣，並經由佇列非同步寫出"""
+    global _listener
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(app.config.get('LOG_LEVEL', 'INFO'))
+    root.propagate = False
+
+    # 重複呼叫 create_app (例如查詢計畫檢查) 時沿用同一組 handler，只更新等級與取樣率
+    for handler in root.handlers:
+        if isinstance(handler, logging.handlers.QueueHandler):
+            for log_filter in handler.filters:
+                if isinstance(log_filter, SamplingFilter):
+                    log_filter.rate = app.config.get('LOG_SAMPLE_RATE', 1.0)
+            return
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(app.config.get('LOG_SAMPLE_RATE', 1.0)))
+    root.addHandler(queue_handler)
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -26,9 +26,46 @@ class Meal(db.Model):
     # 儲存此便當所屬 Canteen 的 ID
     canteen_id = db.Column(db.Integer, db.ForeignKey('canteen.id'), nullable=False)
 
+    # 目前的菜單版本 (MealRevision.id)：新增便當或修改名稱/價格時更新，新訂單參照此版本
+    # (不設外鍵，避免 meal 與 meal_revision 互相參照)
+    current_revision_id = db.Column(db.Integer)
+
+    # 公開菜單查詢：依餐廳取出活躍的便當；管理列表依 (canteen_id, id) 做 keyset 分頁
+    # (既有資料庫以 flask create-indexes 補建)
+    __table_args__ = (
+        db.Index('ix_meal_canteen_active', 'canteen_id', 'is_active'),
+        db.Index('ix_meal_canteen_page', 'canteen_id', 'id'),
+    )
+
     def get_price_yuan(self):
         """獲取以元為單位的價格"""
         return self.price / 100.0
 
     def __repr__(self):
-        return f'<Meal id={self.id}, name={self.name}, price={self.get_price_yuan()}元>'
\ No newline at end of file
+        return f'<Meal id={self.id}, name={self.name}, price={self.get_price_yuan()}元>'
+
+
+class MealRevision(db.Model):
+    # 便當的不可變版本：新增便當或修改名稱/價格時各建立一筆 (見 services/meal_revisions.py)，
+    # 訂單以整數 ID 參照訂購當時的版本，名稱與價格不再逐筆複製到 order_record
+    __tablename__ = 'meal_revision'
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    meal_id = db.Column(db.Integer, db.ForeignKey('meal.id'), nullable=False)
+
+    # 此版本的便當名稱
+    name = db.Column(db.String(100), nullable=False)
+
+    # 此版本的價格 (以分儲存)
+    price = db.Column(db.Integer, nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # 依便當查詢版本 (刪除便當、資料移轉)
+    __table_args__ = (
+        db.Index('ix_meal_revision_meal', 'meal_id'),
+    )
+
+    def __repr__(self):
+        return f'<MealRevision id={self.id}, meal_id={self.meal_id}, name={self.name}, price={self.price / 100.0}元>'
@@ -20,14 +20,12 @@ class Order(db.Model):
     
     # ========================
     # 訂單細節 (Snapshot of the Meal)
-    # ❗ 註：訂單必須儲存價格快照，因為便當價格未來可能改變
+    # ❗ 註：訂單必須保留訂購當時的名稱與價格，因為便當價格未來可能改變
+    #       名稱與價格存於不可變的便當版本 (MealRevision)，訂單只記錄整數的版本 ID
     # ========================
     
-    # 訂購時的便當名稱快照
-    meal_name_snapshot = db.Column(db.String(100), nullable=False)
-    
-    # 訂購時的價格快照 (以分儲存)
-    price_snapshot = db.Column(db.Integer, nullable=False)
+    # 訂購時的便當版本
+    meal_revision_id = db.Column(db.Integer, db.ForeignKey('meal_revision.id'), nullable=False)
     
     # ========================
     # 訂單狀態與時間
@@ -52,14 +50,32 @@ class Order(db.Model):
     # 與 Meal 建立關聯
     meal = db.relationship('Meal', backref='orders')
 
+    # 與 MealRevision 建立關聯 (訂購當時的名稱與價格)
+    meal_revision = db.relationship('MealRevision')
+
     # 設置複合唯一約束：確保同一個用戶在同一天只能訂購一次
+    # (此約束同時作為「用戶 + 日期」查詢的索引，例如 /orders/mine)
     __table_args__ = (
         db.UniqueConstraint('user_id', 'order_date', name='_user_day_uc'),
+        # 依日期查詢/統計 (每日統計重建、日期區間報表)
+        db.Index('ix_order_record_order_date', 'order_date'),
+        # 未繳款報表與批次結算 (is_paid = false，可再加日期區間)
+        db.Index('ix_order_record_paid_date', 'is_paid', 'order_date'),
     )
     
+    @property
+    def meal_name(self):
+        """訂購時的便當名稱"""
+        return self.meal_revision.name
+
+    @property
+    def price(self):
+        """訂購時的價格 (分)"""
+        return self.meal_revision.price
+
     def get_price_yuan(self):
-        """獲取以元為單位的價格快照"""
-        return self.price_snapshot / 100.0
+        """獲取以元為單位的訂購價格"""
+        return self.price / 100.0
 
     def __repr__(self):
-        return f'<Order id={self.id}, user_id={self.user_id}, meal={self.meal_name_snapshot}, date={self.order_date}>'
\ No newline at end of file
+        return f'<Order id={self.id}, user_id={self.user_id}, revision={self.meal_revision_id}, date={self.order_date}>'
\ No newline at end of file
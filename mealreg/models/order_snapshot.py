@@ -0,0 +1,71 @@
+# mealreg/models/order_snapshot.py
+
+from datetime import datetime
+
+from ..extensions import db
+
+class OrderDaySnapshot(db.Model):
+    # 截止後凍結的每日快照 (表頭)：存在這一列即代表該日期已凍結，之後的報表直接讀取快照，不再彙總 order_record
+    __tablename__ = 'order_day_snapshot'
+
+    # 訂購日期
+    order_date = db.Column(db.Date, primary_key=True)
+
+    # 當天總訂單數
+    total_orders = db.Column(db.Integer, nullable=False, default=0)
+
+    # 當天總金額 (以分儲存)
+    total_amount_cents = db.Column(db.Integer, nullable=False, default=0)
+
+    # 凍結時間
+    frozen_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    def __repr__(self):
+        return f'<OrderDaySnapshot date={self.order_date}, orders={self.total_orders}>'
+
+
+class CanteenProductionSnapshot(db.Model):
+    # 各餐廳的備餐清單快照：(日期, 餐廳, 便當版本) 的訂購數量與金額，名稱在凍結時一併保存
+    __tablename__ = 'canteen_production_snapshot'
+
+    order_date = db.Column(db.Date, db.ForeignKey('order_day_snapshot.order_date'), primary_key=True)
+
+    canteen_id = db.Column(db.Integer, primary_key=True)
+
+    # 便當版本 (與 Order.meal_revision_id 一致；同一便當當天改名或改價時各自一列)
+    meal_revision_id = db.Column(db.Integer, primary_key=True)
+
+    meal_id = db.Column(db.Integer, nullable=False)
+
+    # 凍結時的便當名稱 (該版本的名稱)
+    meal_name = db.Column(db.String(100), nullable=False)
+
+    # 凍結時的餐廳名稱
+    canteen_name = db.Column(db.String(100), nullable=False)
+
+    # 訂購數量
+    order_count = db.Column(db.Integer, nullable=False)
+
+    # 總金額 (以分儲存)
+    total_price_cents = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f'<CanteenProductionSnapshot date={self.order_date}, canteen={self.canteen_id}, meal={self.meal_name}, count={self.order_count}>'
+
+
+class UserChargeSnapshot(db.Model):
+    # 每位用戶當天的應繳金額快照：(日期, 用戶) 的訂單數與金額 (繳款狀態仍會變動，不在快照內)
+    __tablename__ = 'user_charge_snapshot'
+
+    order_date = db.Column(db.Date, db.ForeignKey('order_day_snapshot.order_date'), primary_key=True)
+
+    user_id = db.Column(db.Integer, primary_key=True)
+
+    # 訂單數
+    order_count = db.Column(db.Integer, nullable=False)
+
+    # 應繳金額 (以分儲存)
+    amount_cents = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f'<UserChargeSnapshot date={self.order_date}, user={self.user_id}, amount={self.amount_cents}>'
@@ -0,0 +1,20 @@
+# mealreg/models/order_summary.py
+
+from ..extensions import db
+
+class OrderDailySummary(db.Model):
+    # 每日訂單統計 (預先彙總)：由訂購/刪除流程同步遞增維護，
+    # 讓 /orders/summary 只需讀取當天少量 (便當版本數) 的資料列，不必每次對 order_record 做 GROUP BY
+    __tablename__ = 'order_daily_summary'
+
+    # 統計日期
+    order_date = db.Column(db.Date, primary_key=True)
+
+    # 便當版本 (與 Order.meal_revision_id 一致；名稱與價格由 meal_revision 取得，金額 = 數量 × 版本價格)
+    meal_revision_id = db.Column(db.Integer, primary_key=True)
+
+    # 訂購數量
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<OrderDailySummary date={self.order_date}, revision={self.meal_revision_id}, count={self.order_count}>'
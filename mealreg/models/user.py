@@ -1,8 +1,8 @@
 # mealreg/models/user.py
 
 from datetime import datetime
-# 匯入密碼散列工具
-from werkzeug.security import generate_password_hash, check_password_hash
+# 匯入密碼散列工具 (雜湊方法與成本由 app.config 設定，見 services/passwords.py)
+from ..services.passwords import hash_password, needs_rehash, verify_password
 # 匯入 db 實例，用於繼承 db.Model
 from ..extensions import db 
 
@@ -21,7 +21,8 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=True)
     
     # 密碼散列值: 用來儲存 hash 過的密碼，保護用戶資訊
-    password_hash = db.Column(db.String(128))
+    # (scrypt 雜湊長度約 160 字元，128 不足以儲存)
+    password_hash = db.Column(db.String(255))
     
     # 權限欄位: True=總務人員 (Admin), False=普通員工 (Employee)
     is_admin = db.Column(db.Boolean, default=False) 
@@ -40,14 +41,19 @@ class User(db.Model):
     # 方法 1: 設定密碼時，自動進行散列
     def set_password(self, password):
         """將純文字密碼轉換為安全的 Hash 值並存入 password_hash 欄位"""
-        # 使用安全的 generate_password_hash 函式
-        self.password_hash = generate_password_hash(password)
+        # 依 PASSWORD_HASH_METHOD / PASSWORD_SALT_LENGTH 設定產生雜湊
+        self.password_hash = hash_password(password)
 
     # 方法 2: 驗證密碼時，比對純文字密碼和 Hash 值
     def check_password(self, password):
         """驗證輸入的密碼是否與儲存的 Hash 值匹配"""
-        # 使用 check_password_hash 函式進行安全比對
-        return check_password_hash(self.password_hash, password)
+        # 使用 check_password_hash 進行安全比對 (啟用 PASSWORD_VERIFY_POOL 時在有上限的驗證池中執行)
+        return verify_password(self.password_hash, password)
+
+    # 方法 3: 檢查儲存的雜湊是否使用舊的方法/成本
+    def password_needs_rehash(self):
+        """雜湊參數與目前設定不同時回傳 True (登入成功後可用明文密碼重新雜湊)"""
+        return needs_rehash(self.password_hash)
 
     # ========================
     # 其他輔助方法
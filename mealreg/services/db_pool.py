@@ -0,0 +1,70 @@
+# mealreg/services/db_pool.py
+# 資料庫連線池設定與觀測：
+# - configure_engine_options(): 將 Config 中的 DB_POOL_* 設定轉為 SQLALCHEMY_ENGINE_OPTIONS (需在 db.init_app 之前呼叫)
+# - 連線池事件統計實際建立的連線數，pool_status() 提供目前的連線池狀態給 /metrics
+#
+# 可設定項目 (Config 或環境變數載入的設定；SQLite 不適用，會被忽略)：
+#   DB_POOL_SIZE       常駐連線數 (預設 5)；gunicorn 每個 worker 各自有一個連線池
+#   DB_MAX_OVERFLOW    尖峰時可額外建立的連線數 (預設 10)
+#   DB_POOL_TIMEOUT    連線池用盡時等待的秒數 (預設 30)
+#   DB_POOL_RECYCLE    連線使用超過此秒數即重建 (預設 280，需小於 MySQL wait_timeout)
+#   DB_POOL_PRE_PING   取出連線前先檢查是否仍有效 (預設 True，避免 "MySQL server has gone away")
+# 若 SQLALCHEMY_ENGINE_OPTIONS 已明確指定同名參數，以該設定為準。
+
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import Pool
+
+POOL_OPTIONS = (
+    # (Config 鍵, create_engine 參數, 預設值)
+    ('DB_POOL_SIZE', 'pool_size', 5),
+    ('DB_MAX_OVERFLOW', 'max_overflow', 10),
+    ('DB_POOL_TIMEOUT', 'pool_timeout', 30),
+    ('DB_POOL_RECYCLE', 'pool_recycle', 280),
+    ('DB_POOL_PRE_PING', 'pool_pre_ping', True),
+)
+
+_connections_opened = 0
+_counter_lock = threading.Lock()
+
+
+def configure_engine_options(app):
+    """依 DB_POOL_* 設定補齊 SQLALCHEMY_ENGINE_OPTIONS (僅限非 SQLite 資料庫)"""
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI')
+    if not uri or make_url(uri).get_backend_name() == 'sqlite':
+        return
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    for config_key, option, default in POOL_OPTIONS:
+        options.setdefault(option, app.config.get(config_key, default))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+@event.listens_for(Pool, 'connect')
+def _count_connection(dbapi_connection, connection_record):
+    global _connections_opened
+    with _counter_lock:
+        _connections_opened += 1
+
+
+def connections_opened():
+    """此行程至今實際建立的資料庫連線數"""
+    return _connections_opened
+
+
+def pool_status(engines):
+    """
+    回傳 {bind 名稱: {size, checked_out, checked_in, overflow}}。
+    engines: db.engines (需在 app context 內取得)；沒有固定大小的連線池 (例如 SQLite) 只回報 checked_out。
+    """
+    status = {}
+    for bind_key, engine in engines.items():
+        pool = engine.pool
+        row = {}
+        for name, attr in (('size', 'size'), ('checked_out', 'checkedout'), ('checked_in', 'checkedin'), ('overflow', 'overflow')):
+            method = getattr(pool, attr, None)
+            if method is not None:
+                row[name] = method()
+        status[bind_key or 'default'] = row
+    return status
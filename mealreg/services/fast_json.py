@@ -0,0 +1,98 @@
+# mealreg/services/fast_json.py
+# 唯讀列表端點的快速 JSON 序列化：
+# 原本的流程是「查詢列 → 手寫 dict (order_to_out / meal_row_to_out) → @output 的 marshmallow Schema 再 dump 一次 → jsonify」，
+# 每一列都被轉換、複製兩次。RowEncoder 依輸出 Schema 的欄位預先算好各欄位在查詢列中的位置 (itemgetter) 與型別轉換
+# (只決定一次)，每列只做一次取值與一次 dict 建立，再一次序列化整個列表，直接回傳 Response (APIFlask 不會再經過 Schema)。
+# @output 仍保留同一個 Schema，OpenAPI 文件照舊由它產生；編碼器建立時會檢查欄位與 Schema 一致。
+#
+# 已安裝 orjson 時使用 orjson (pip install orjson)，否則使用標準庫 json。
+# 設定 FAST_JSON_ENABLED = False 可改回 marshmallow 序列化 (除錯或比對輸出時使用)。
+
+import json
+from datetime import date
+from operator import itemgetter
+
+from flask import current_app
+
+try:
+    import orjson
+except ImportError:  # 選用套件：未安裝時使用標準庫 json
+    orjson = None
+
+
+def _default(value):
+    # 標準庫 json 不支援的型別 (與 marshmallow / Flask 的輸出格式一致)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f'無法序列化 {type(value).__name__}')
+
+
+if orjson is not None:
+    def dumps(obj):
+        """序列化為 JSON bytes (orjson)"""
+        return orjson.dumps(obj)
+else:
+    _encode = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False, default=_default).encode
+
+    def dumps(obj):
+        """序列化為 JSON bytes (標準庫 json)"""
+        return _encode(obj).encode('utf-8')
+
+
+def fast_json_enabled():
+    return current_app.config.get('FAST_JSON_ENABLED', True)
+
+
+def cents_to_yuan(value):
+    """價格 (分) 轉為元，與輸出 Schema 的 Float 欄位一致"""
+    return value / 100.0
+
+
+class RowEncoder:
+    """
+    由輸出 Schema 與查詢欄位順序建立的列編碼器 (欄位位置與轉換在建立時預先計算)。
+    schema: 輸出 Schema 類別 (欄位名稱需與 columns 完全一致)
+    columns: 查詢結果各欄位的名稱 (依 SELECT 順序)
+    converters: {欄位名稱: 轉換函式}，未列出的欄位直接輸出 (日期/時間輸出為 ISO 格式)
+    輸出的鍵依名稱排序，與 Flask jsonify 的輸出相同。
+    """
+
+    def __init__(self, schema, columns, converters=None):
+        converters = converters or {}
+        fields = set(schema().dump_fields)
+        if fields != set(columns):
+            raise ValueError(f'{schema.__name__} 的欄位 {sorted(fields)} 與查詢欄位 {list(columns)} 不一致')
+
+        # 欄位位置與轉換只在建立時決定一次：itemgetter 依輸出鍵的順序取出各欄位，
+        # 有轉換的欄位以 (位置, 函式) 記錄，每列只做一次取值、少數幾次轉換與一次 dict 建立
+        names = sorted(columns)
+        self._names = tuple(names)
+        self._getter = itemgetter(*[list(columns).index(name) for name in names])
+        self._converters = tuple(
+            (position, converters[name]) for position, name in enumerate(names) if name in converters
+        )
+        if len(names) == 1:
+            # 只有一個欄位時 itemgetter 回傳單一值而非 tuple
+            getter = self._getter
+            self._getter = lambda row: (getter(row),)
+
+    def to_dict(self, row):
+        """將單一查詢列轉為輸出 dict"""
+        values = self._getter(row)
+        if self._converters:
+            values = list(values)
+            for position, convert in self._converters:
+                values[position] = convert(values[position])
+        return dict(zip(self._names, values))
+
+    def encode(self, rows):
+        """將查詢列序列化為 JSON 陣列 (bytes)"""
+        to_dict = self.to_dict
+        return dumps([to_dict(row) for row in rows])
+
+    def response(self, rows, headers=None):
+        """回傳 JSON 陣列的 Response (headers 例如分頁的 X-Next-Cursor)"""
+        response = current_app.response_class(self.encode(rows), mimetype='application/json')
+        if headers:
+            response.headers.update(headers)
+        return response
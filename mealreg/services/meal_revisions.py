@@ -0,0 +1,108 @@
+# mealreg/services/meal_revisions.py
+# 便當版本 (meal_revision)：
+# - record_revision(): 新增便當或修改名稱/價格時建立新版本，並更新 Meal.current_revision_id
+# - ensure_current_revisions(): 替尚未有版本的便當補建版本 (批次匯入便當、資料移轉時使用)
+# - migrate_meal_revisions(): 將舊資料表 (訂單直接存放 meal_name_snapshot / price_snapshot) 移轉為參照版本
+#   (執行方式: flask --app app migrate-meal-revisions；可重複執行)
+
+import click
+from sqlalchemy import func, inspect, select, text, update
+
+from ..extensions import db
+from ..models.meal import Meal, MealRevision
+
+
+def record_revision(meal, session=None):
+    """以便當目前的名稱與價格建立新版本並設為目前版本 (不 commit；meal 需已 flush 取得 ID)"""
+    session = session or db.session
+    revision = MealRevision(meal_id=meal.id, name=meal.name, price=meal.price)
+    session.add(revision)
+    session.flush()
+    meal.current_revision_id = revision.id
+    return revision
+
+
+def ensure_current_revisions():
+    """替 current_revision_id 為空的便當各建立一個版本 (兩條批次 SQL)，回傳補建的數量 (不 commit)"""
+    missing = select(Meal.id, Meal.name, Meal.price).where(Meal.current_revision_id.is_(None))
+    result = db.session.execute(
+        MealRevision.__table__.insert().from_select(['meal_id', 'name', 'price'], missing)
+    )
+    latest = (
+        select(func.max(MealRevision.id))
+        .where(MealRevision.meal_id == Meal.id)
+        .scalar_subquery()
+    )
+    db.session.execute(
+        update(Meal).where(Meal.current_revision_id.is_(None)).values(current_revision_id=latest)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def migrate_meal_revisions(echo=click.echo):
+    """
+    將既有資料庫移轉到便當版本：
+    1. 建立 meal_revision 表並補上 meal.current_revision_id / order_record.meal_revision_id 欄位
+    2. 依舊訂單的 (meal_id, meal_name_snapshot, price_snapshot) 建立歷史版本並回填 meal_revision_id，
+       之後移除這兩個舊欄位
+    3. 替每個便當建立目前版本
+    4. 由新的欄位重建每日統計表與截止快照 (舊的統計表以名稱為鍵，直接重建)
+    已移轉的資料庫再次執行時不會有任何變更。
+    """
+    from ..models.order_snapshot import CanteenProductionSnapshot, OrderDaySnapshot, UserChargeSnapshot
+    from ..models.order_summary import OrderDailySummary
+    from .order_summary import rebuild_summary
+    from .snapshots import freeze_closed_days, invalidate_snapshot_cache
+
+    engine = db.engine
+    db.create_all()
+
+    def columns(table):
+        return {column['name'] for column in inspect(engine).get_columns(table)}
+
+    with engine.begin() as connection:
+        if 'current_revision_id' not in columns('meal'):
+            connection.execute(text('ALTER TABLE meal ADD COLUMN current_revision_id INTEGER'))
+            echo("-> 已新增欄位 meal.current_revision_id")
+        if 'meal_revision_id' not in columns('order_record'):
+            connection.execute(text('ALTER TABLE order_record ADD COLUMN meal_revision_id INTEGER REFERENCES meal_revision (id)'))
+            echo("-> 已新增欄位 order_record.meal_revision_id")
+
+        if 'meal_name_snapshot' in columns('order_record'):
+            created = connection.execute(text(
+                'INSERT INTO meal_revision (meal_id, name, price, created_at) '
+                'SELECT meal_id, meal_name_snapshot, price_snapshot, MIN(created_at) FROM order_record '
+                'WHERE meal_revision_id IS NULL GROUP BY meal_id, meal_name_snapshot, price_snapshot'
+            )).rowcount
+            connection.execute(text(
+                'UPDATE order_record SET meal_revision_id = ('
+                'SELECT MAX(r.id) FROM meal_revision r WHERE r.meal_id = order_record.meal_id '
+                'AND r.name = order_record.meal_name_snapshot AND r.price = order_record.price_snapshot'
+                ') WHERE meal_revision_id IS NULL'
+            ))
+            connection.execute(text('ALTER TABLE order_record DROP COLUMN meal_name_snapshot'))
+            connection.execute(text('ALTER TABLE order_record DROP COLUMN price_snapshot'))
+            echo(f"-> 已由歷史訂單建立 {created} 個便當版本，並移除 order_record 的名稱/價格快照欄位")
+
+    # 便當目前的名稱/價格若與歷史版本相同則直接沿用，否則建立新版本
+    pending = db.session.execute(
+        update(Meal).where(Meal.current_revision_id.is_(None)).values(current_revision_id=(
+            select(func.max(MealRevision.id))
+            .where(MealRevision.meal_id == Meal.id, MealRevision.name == Meal.name, MealRevision.price == Meal.price)
+            .scalar_subquery()
+        )).execution_options(synchronize_session=False)
+    ).rowcount
+    created = ensure_current_revisions()
+    db.session.commit()
+    echo(f"-> 便當目前版本已就緒 (沿用歷史版本 {pending - created} 個，新建 {created} 個)")
+
+    # 以名稱為鍵的舊統計表/快照改為以版本為鍵，重建
+    if any('meal_revision_id' not in columns(model.__tablename__) for model in (OrderDailySummary, CanteenProductionSnapshot)):
+        for model in (CanteenProductionSnapshot, UserChargeSnapshot, OrderDaySnapshot, OrderDailySummary):
+            model.__table__.drop(engine, checkfirst=True)
+        db.create_all()
+        invalidate_snapshot_cache()
+        rows = rebuild_summary()
+        frozen = freeze_closed_days()
+        echo(f"-> 每日統計已重建 ({rows} 筆)，重新凍結 {len(frozen)} 個已截止的日期。")
@@ -0,0 +1,59 @@
+# mealreg/services/menu_cache.py
+# 公開菜單 (/public/menu) 的行程內快取：
+# 11:00 前所有員工同時刷新菜單，菜單內容卻很少變動，
+# 因此只在第一次請求 (或失效後) 查詢並序列化一次，之後直接回傳快取好的 JSON 與 ETag。
+
+import hashlib
+import threading
+import time
+
+from flask import current_app
+
+from .fast_json import dumps
+
+# 快取內容: (etag, body_bytes, built_at)
+_menu_entry = None
+# 重建鎖：避免快取失效瞬間大量請求同時打資料庫 (cache stampede)
+_menu_lock = threading.Lock()
+
+
+def get_menu_payload(build_payload):
+    """
+    取得菜單的 (etag, JSON bytes)。
+    build_payload: 無參數函式，回傳已序列化好的菜單資料 (list/dict)，只在快取未命中時呼叫。
+    """
+    ttl = current_app.config.get('MENU_CACHE_TTL', 60)
+    entry = _menu_entry
+    if entry is not None and not _is_expired(entry, ttl):
+        return entry[0], entry[1]
+
+    with _menu_lock:
+        # 取得鎖之後再檢查一次，可能已被其他執行緒重建
+        entry = _menu_entry
+        if entry is not None and not _is_expired(entry, ttl):
+            return entry[0], entry[1]
+
+        return _store(build_payload())
+
+
+def _store(payload):
+    """序列化並寫入快取 (呼叫端需持有 _menu_lock)，回傳 (etag, body)"""
+    global _menu_entry
+    body = dumps(payload)
+    etag = hashlib.sha256(body).hexdigest()
+    _menu_entry = (etag, body, time.monotonic())
+    return etag, body
+
+
+def invalidate_menu_cache():
+    """餐廳或便當資料異動後呼叫，讓下一次菜單查詢重新建立快取"""
+    global _menu_entry
+    _menu_entry = None
+
+
+def _is_expired(entry, ttl):
+    # TTL 是多 worker 部署時的保險：其他 worker 的寫入無法通知本行程，最多延遲 ttl 秒
+    # ttl 設為 0 或 None 代表只依賴主動失效
+    if not ttl:
+        return False
+    return time.monotonic() - entry[2] > ttl
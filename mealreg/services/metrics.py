@@ -0,0 +1,198 @@
+# mealreg/services/metrics.py
+# 端點效能指標：
+# - Flask 請求掛鉤記錄每個端點的延遲、回應狀態
+# - SQLAlchemy 游標事件記錄每個請求發出的 SQL 數量與累計 DB 時間
+# - 以 Prometheus 文字格式由 /metrics 輸出 (見 api/metrics.py；需 METRICS_TOKEN 或 METRICS_ALLOWED_IPS 才能讀取)
+# - 單一請求的查詢數超過 METRICS_QUERY_COUNT_THRESHOLD 時記錄警告 (用來抓 N+1)
+# 指標存在行程記憶體中；gunicorn 多 worker 時每個 worker 各自累計，由 Prometheus 分別抓取後加總。
+
+import logging
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ..log import get_logger, log_event
+from .db_pool import connections_opened, pool_status
+
+logger = get_logger(__name__)
+
+# 直方圖的區間上限
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """累積型直方圖 (Prometheus histogram 語意：每個區間計數包含所有較小的值)"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    """行程內的指標儲存；所有寫入都在同一把鎖內完成"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = {}        # (method, endpoint, status) -> 次數
+        self.latency = {}         # (method, endpoint) -> Histogram (秒)
+        self.queries = {}         # (method, endpoint) -> Histogram (每個請求的 SQL 數)
+        self.db_time = {}         # (method, endpoint) -> Histogram (每個請求的 DB 時間，秒)
+
+    def observe_request(self, method, endpoint, status, duration, query_count, db_seconds):
+        key = (method, endpoint)
+        with self._lock:
+            self.requests[(method, endpoint, status)] = self.requests.get((method, endpoint, status), 0) + 1
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(duration)
+            self.queries.setdefault(key, Histogram(QUERY_COUNT_BUCKETS)).observe(query_count)
+            self.db_time.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(db_seconds)
+
+    def render(self):
+        """輸出 Prometheus text exposition format (0.0.4)"""
+        lines = []
+        with self._lock:
+            lines.append('# HELP mealreg_http_requests_total Total HTTP requests by endpoint and status.')
+            lines.append('# TYPE mealreg_http_requests_total counter')
+            for (method, endpoint, status), value in sorted(self.requests.items()):
+                labels = _labels(method=method, endpoint=endpoint, status=status)
+                lines.append(f'mealreg_http_requests_total{{{labels}}} {value}')
+
+            _render_histogram(lines, 'mealreg_http_request_duration_seconds', 'Request latency in seconds.', self.latency)
+            _render_histogram(lines, 'mealreg_db_queries_per_request', 'SQL statements issued per request.', self.queries)
+            _render_histogram(lines, 'mealreg_db_seconds_per_request', 'Total SQL execution time per request in seconds.', self.db_time)
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+# create_app() 的耗時 (秒)；每個 gunicorn worker 各自記錄
+_startup_seconds = None
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _render_histogram(lines, name, help_text, histograms):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    for (method, endpoint), hist in sorted(histograms.items()):
+        labels = _labels(method=method, endpoint=endpoint)
+        for upper, count in zip(hist.buckets, hist.counts):
+            lines.append(f'{name}_bucket{{{labels},le="{upper}"}} {count}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.count}')
+        lines.append(f'{name}_sum{{{labels}}} {hist.sum:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {hist.count}')
+
+
+def record_startup(app, seconds):
+    """記錄應用程式建立耗時 (由 create_app 呼叫)"""
+    global _startup_seconds
+    _startup_seconds = seconds
+    log_event(logger, 'app_created', startup_ms=round(seconds * 1000, 2), app=app.name)
+
+
+def render_runtime(engines):
+    """輸出行程層級的量測值：啟動耗時、已建立的連線數與各連線池狀態"""
+    lines = []
+    if _startup_seconds is not None:
+        lines.append('# HELP mealreg_app_startup_seconds Time spent in create_app() for this worker.')
+        lines.append('# TYPE mealreg_app_startup_seconds gauge')
+        lines.append(f'mealreg_app_startup_seconds {_startup_seconds:.6f}')
+    lines.append('# HELP mealreg_db_connections_opened_total DB connections opened by this worker.')
+    lines.append('# TYPE mealreg_db_connections_opened_total counter')
+    lines.append(f'mealreg_db_connections_opened_total {connections_opened()}')
+    lines.append('# HELP mealreg_db_pool_connections Connection pool state per bind.')
+    lines.append('# TYPE mealreg_db_pool_connections gauge')
+    for bind, row in sorted(pool_status(engines).items()):
+        for state, value in row.items():
+            lines.append(f'mealreg_db_pool_connections{{{_labels(bind=bind, state=state)}}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+# ------------------------------
+# SQLAlchemy 游標事件 (掛在 Engine 類別上，涵蓋所有 bind)
+# ------------------------------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    # 只統計請求內的查詢 (CLI 指令、背景工作不計)
+    if has_request_context() and 'metrics_start' in g:
+        g.metrics_queries += 1
+        g.metrics_db_seconds += elapsed
+
+
+def _install_engine_listeners():
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+# ------------------------------
+# Flask 請求掛鉤
+# ------------------------------
+
+def _start_request():
+    g.metrics_start = time.perf_counter()
+    g.metrics_queries = 0
+    g.metrics_db_seconds = 0.0
+
+
+def _record_status(response):
+    g.metrics_status = response.status_code
+    return response
+
+
+def _finish_request(exc):
+    # teardown 在串流回應送完之後才執行，因此延遲與查詢數包含串流期間
+    if 'metrics_start' not in g:
+        return
+    duration = time.perf_counter() - g.pop('metrics_start')
+    endpoint = request.endpoint or 'unmatched'
+    status = 500 if exc is not None else g.get('metrics_status', 500)
+    registry.observe_request(request.method, endpoint, status, duration, g.metrics_queries, g.metrics_db_seconds)
+
+    threshold = current_app.config.get('METRICS_QUERY_COUNT_THRESHOLD', 20)
+    if threshold and g.metrics_queries > threshold:
+        log_event(
+            logger, 'too_many_queries', logging.WARNING,
+            method=request.method, endpoint=endpoint, path=request.path, status=status,
+            query_count=g.metrics_queries, db_ms=round(g.metrics_db_seconds * 1000, 2),
+            duration_ms=round(duration * 1000, 2),
+        )
+
+
+def init_metrics(app):
+    """註冊請求掛鉤與 SQLAlchemy 事件 (需設定 METRICS_ENABLED = True；預設不啟用)"""
+    if not app.config.get('METRICS_ENABLED', False):
+        return
+    _install_engine_listeners()
+    app.before_request(_start_request)
+    app.after_request(_record_status)
+    app.teardown_request(_finish_request)
@@ -0,0 +1,103 @@
+# mealreg/services/order_summary.py
+# 每日訂單統計表 (order_daily_summary) 的維護：
+# - apply_summary_deltas(): 在訂單寫入/刪除的同一個交易中遞增更新 (upsert)
+# - rebuild_summary(): 由 order_record 重新計算指定日期區間 (首次建表或資料修正時使用)
+
+from collections import defaultdict
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from ..extensions import db
+from ..models.order import Order
+from ..models.order_summary import OrderDailySummary
+
+
+def summary_deltas(rows, sign=1):
+    """
+    將訂單資料彙總為統計增量 {(order_date, meal_revision_id): count}。
+    rows: 具有 order_date / meal_revision_id 的 dict 或物件；sign=-1 表示刪除。
+    """
+    deltas = defaultdict(int)
+    for row in rows:
+        if isinstance(row, dict):
+            key = (row['order_date'], row['meal_revision_id'])
+        else:
+            key = (row.order_date, row.meal_revision_id)
+        deltas[key] += sign
+    return deltas
+
+
+def apply_summary_deltas(deltas):
+    """
+    以 upsert 將增量累加到統計表 (不 commit，由呼叫端與訂單寫入一起提交)。
+    SQLite / MySQL 使用原生 upsert，以單一 executemany 完成；其他資料庫改用先 UPDATE 再 INSERT。
+    """
+    if not deltas:
+        return
+
+    params = [
+        {'order_date': order_date, 'meal_revision_id': revision_id, 'order_count': count}
+        for (order_date, revision_id), count in deltas.items()
+    ]
+    table = OrderDailySummary.__table__
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        stmt = sqlite_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.order_date, table.c.meal_revision_id],
+            set_={'order_count': table.c.order_count + stmt.excluded.order_count}
+        )
+        db.session.execute(stmt, params)
+    elif dialect in ('mysql', 'mariadb'):
+        stmt = mysql_insert(table)
+        stmt = stmt.on_duplicate_key_update(
+            order_count=table.c.order_count + stmt.inserted.order_count,
+        )
+        db.session.execute(stmt, params)
+    else:
+        for param in params:
+            result = db.session.execute(
+                update(table)
+                .where(table.c.order_date == param['order_date'], table.c.meal_revision_id == param['meal_revision_id'])
+                .values(order_count=table.c.order_count + param['order_count'])
+            )
+            if result.rowcount == 0:
+                db.session.execute(insert(table).values(**param))
+
+
+def rebuild_summary(start_date=None, end_date=None):
+    """
+    由 order_record 重新計算統計表 (INSERT ... SELECT ... GROUP BY)，並 commit。
+    未指定日期時重建全部；回傳重建後的統計列數。
+    """
+    conditions = []
+    summary_conditions = []
+    if start_date:
+        conditions.append(Order.order_date >= start_date)
+        summary_conditions.append(OrderDailySummary.order_date >= start_date)
+    if end_date:
+        conditions.append(Order.order_date <= end_date)
+        summary_conditions.append(OrderDailySummary.order_date <= end_date)
+
+    # 先清除區間內的舊統計，再以 INSERT ... SELECT 一次寫回
+    db.session.execute(delete(OrderDailySummary).where(*summary_conditions))
+
+    aggregate = (
+        select(
+            Order.order_date,
+            Order.meal_revision_id,
+            func.count(Order.id)
+        )
+        .where(*conditions)
+        .group_by(Order.order_date, Order.meal_revision_id)
+    )
+    result = db.session.execute(
+        insert(OrderDailySummary).from_select(
+            ['order_date', 'meal_revision_id', 'order_count'], aggregate
+        )
+    )
+    db.session.commit()
+    return result.rowcount
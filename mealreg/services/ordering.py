@@ -0,0 +1,181 @@
+# mealreg/services/ordering.py
+# 批次訂單寫入：一次預先載入所需的便當/餐廳/用戶/既有訂單，逐筆判斷後以單一 executemany 寫入，整批只 commit 一次。
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from ..extensions import db
+from ..models.canteen import Canteen
+from ..models.meal import Meal
+from ..models.order import Order
+from ..models.user import User
+from .order_summary import apply_summary_deltas, summary_deltas
+from .settings import get_setting
+from .snapshots import freeze_day, frozen_dates, frozen_message, invalidate_snapshot_cache, unfreeze_days
+
+# 每筆結果的狀態
+STATUS_CREATED = 'created'
+STATUS_CONFLICT = 'conflict'
+STATUS_INVALID = 'invalid'
+
+
+def load_meal_map(meal_ids):
+    """以單一 JOIN 查詢取得 {meal_id: row}，row 包含便當 (含目前版本) 與所屬餐廳的狀態"""
+    if not meal_ids:
+        return {}
+    rows = db.session.execute(
+        select(
+            Meal.id, Meal.name, Meal.price, Meal.is_active, Meal.current_revision_id,
+            Canteen.name.label('canteen_name'), Canteen.is_active.label('canteen_is_active')
+        )
+        .join(Canteen, Meal.canteen_id == Canteen.id)
+        .where(Meal.id.in_(meal_ids))
+    ).all()
+    return {row.id: row for row in rows}
+
+
+def check_meal(meal):
+    """檢查便當是否可訂購，可訂購時回傳 None，否則回傳錯誤訊息"""
+    if meal is None:
+        return "找不到指定的便當或該便當已下架。"
+    if not meal.is_active:
+        return "該便當目前已暫停販售。"
+    if not meal.canteen_is_active:
+        return f"所屬餐廳 '{meal.canteen_name}' 目前暫停訂購。"
+    return None
+
+
+def check_order_date(order_date, now=None):
+    """
+    檢查是否可訂購該日期的便當，可訂購時回傳 None，否則回傳錯誤訊息。
+    每個日期各自以當天的 ORDER_CUTOFF_TIME 截止 (過去的日期自然已截止)；
+    最遠只能預訂到今天之後 ORDER_BOOKING_DAYS 天。
+    """
+    now = now or datetime.now()
+    cutoff_time = get_setting('ORDER_CUTOFF_TIME')
+    if now > datetime.combine(order_date, cutoff_time):
+        return f"{order_date.isoformat()} 的訂購已於 {cutoff_time.strftime('%H:%M')} 截止。"
+    booking_days = get_setting('ORDER_BOOKING_DAYS')
+    if order_date > now.date() + timedelta(days=booking_days):
+        return f"最多只能預訂 {booking_days} 天內的便當。"
+    return None
+
+
+def _load_existing_keys(user_ids, order_dates):
+    """查詢這批用戶在這些日期已存在的訂單，回傳 {(user_id, order_date)}"""
+    rows = db.session.execute(
+        select(Order.user_id, Order.order_date)
+        .where(Order.user_id.in_(user_ids), Order.order_date.in_(order_dates))
+    ).all()
+    return {(row.user_id, row.order_date) for row in rows}
+
+
+def _classify(items, meal_map, known_users, existing, date_errors):
+    """逐筆判斷結果狀態，回傳 (results, rows_to_insert)"""
+    results = []
+    rows = []
+    seen = set(existing)
+
+    for index, item in enumerate(items):
+        user_id = item['user_id']
+        meal_id = item['meal_id']
+        order_date = item.get('order_date') or date.today()
+        result = {
+            'index': index,
+            'user_id': user_id,
+            'meal_id': meal_id,
+            'order_date': order_date.isoformat(),
+            'order_id': None,
+            'message': None,
+        }
+        results.append(result)
+
+        meal = meal_map.get(meal_id)
+        error = "找不到指定的用戶。" if user_id not in known_users else (date_errors.get(order_date) or check_meal(meal))
+        if error:
+            result['status'] = STATUS_INVALID
+            result['message'] = error
+            continue
+
+        # 已存在的訂單或同一批次中的重複項目 (同一用戶同一天只能訂一次)
+        if (user_id, order_date) in seen:
+            result['status'] = STATUS_CONFLICT
+            result['message'] = f"該用戶 ({order_date.isoformat()}) 已經訂購過了。"
+            continue
+
+        seen.add((user_id, order_date))
+        result['status'] = STATUS_CREATED
+        rows.append({
+            'user_id': user_id,
+            'meal_id': meal_id,
+            'meal_revision_id': meal.current_revision_id, # 紀錄訂購時的便當版本 (名稱與價格)
+            'order_date': order_date,
+            'is_paid': False,
+        })
+
+    return results, rows
+
+
+def place_orders_bulk(items, retries=1, check_dates=False):
+    """
+    批次建立訂單。
+    items: [{'user_id': int, 'meal_id': int, 'order_date': date | None}, ...]
+    回傳每筆的結果 (順序與輸入相同)；所有新訂單以單一 executemany 寫入並只 commit 一次。
+    check_dates=True 時，每個日期依 check_order_date 檢查截止時間與可預訂天數，已凍結的日期也不可訂購 (員工預訂使用)。
+    check_dates=False (總務補登) 時可寫入已凍結的日期：快照與訂單在同一交易中刪除/寫入，提交後重新凍結。
+    若寫入時與其他請求競爭而違反 _user_day_uc，會重新讀取既有訂單並重試。
+    """
+    user_ids = {item['user_id'] for item in items}
+    meal_map = load_meal_map({item['meal_id'] for item in items})
+    known_users = set(db.session.execute(select(User.id).where(User.id.in_(user_ids))).scalars())
+    order_dates = {item.get('order_date') or date.today() for item in items}
+    frozen = frozen_dates(order_dates)
+    # 截止檢查只依日期而定，每個日期算一次
+    date_errors = {}
+    if check_dates:
+        now = datetime.now()
+        for order_date in order_dates:
+            error = frozen_message(order_date) if order_date in frozen else check_order_date(order_date, now)
+            if error:
+                date_errors[order_date] = error
+
+    while True:
+        existing = _load_existing_keys(user_ids, order_dates)
+        results, rows = _classify(items, meal_map, known_users, existing, date_errors)
+        if not rows:
+            return results
+
+        refreeze = frozen & {row['order_date'] for row in rows}
+        try:
+            db.session.execute(insert(Order), rows)
+            apply_summary_deltas(summary_deltas(rows)) # 同一交易中更新每日統計表
+            if refreeze:
+                unfreeze_days(refreeze) # 舊快照與新訂單一起提交，不會有快照少算訂單的時刻
+            db.session.commit()
+            break
+        except IntegrityError:
+            db.session.rollback()
+            if retries <= 0:
+                raise
+            retries -= 1
+
+    if refreeze:
+        invalidate_snapshot_cache()
+        for order_date in sorted(refreeze):
+            freeze_day(order_date)
+
+    # 回填新訂單 ID (一次查詢)
+    created_ids = {
+        (row.user_id, row.order_date): row.id
+        for row in db.session.execute(
+            select(Order.id, Order.user_id, Order.order_date)
+            .where(Order.user_id.in_({row['user_id'] for row in rows}), Order.order_date.in_(order_dates))
+        )
+    }
+    for result in results:
+        if result['status'] == STATUS_CREATED:
+            result['order_id'] = created_ids.get((result['user_id'], date.fromisoformat(result['order_date'])))
+
+    return results
@@ -0,0 +1,58 @@
+# mealreg/services/pagination.py
+# Keyset (游標) 分頁工具：以「最後一筆的排序鍵」作為下一頁的起點，
+# 查詢成本只與每頁筆數有關，不會像 OFFSET 一樣隨著頁數/歷史資料成長而變慢。
+
+import base64
+import json
+from datetime import date
+
+from apiflask import Schema, abort
+from apiflask.fields import Integer, String
+from apiflask.validators import Range
+from flask import current_app
+
+# 下一頁游標透過回應標頭提供 (回應主體維持原本的列表格式)
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+class PageIn(Schema):
+    limit = Integer(validate=Range(min=1), metadata={'description': '每頁筆數 (預設 PAGE_SIZE_DEFAULT，上限 PAGE_SIZE_MAX)'})
+    cursor = String(metadata={'description': f'分頁游標 (取自上一頁回應標頭 {NEXT_CURSOR_HEADER})'})
+
+
+def page_size(query_data):
+    """依查詢參數與設定決定每頁筆數"""
+    default = current_app.config.get('PAGE_SIZE_DEFAULT', 50)
+    maximum = current_app.config.get('PAGE_SIZE_MAX', 500)
+    return min(query_data.get('limit') or default, maximum)
+
+
+def encode_cursor(*values):
+    """將排序鍵編碼為不透明的游標字串 (日期以 ISO 格式保存)"""
+    payload = [value.isoformat() if isinstance(value, date) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, *types):
+    """
+    解碼游標並依 types 轉回原本的型別 (int / date)；游標無效時回傳 400。
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if len(values) != len(types):
+            raise ValueError
+        return [date.fromisoformat(value) if kind is date else kind(value) for value, kind in zip(values, types)]
+    except (ValueError, TypeError):
+        abort(400, message="分頁游標無效。")
+
+
+def paginate(rows, limit, key):
+    """
+    rows 為查詢 limit + 1 筆的結果；回傳 (本頁資料, 回應標頭)。
+    多取的一筆用來判斷是否還有下一頁，key(row) 回傳該列的排序鍵。
+    """
+    if len(rows) <= limit:
+        return rows, {}
+    rows = rows[:limit]
+    return rows, {NEXT_CURSOR_HEADER: encode_cursor(*key(rows[-1]))}
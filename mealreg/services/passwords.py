@@ -0,0 +1,106 @@
+# mealreg/services/passwords.py
+# 密碼雜湊策略：
+# - 雜湊方法與成本由設定決定 (PASSWORD_HASH_METHOD，例如 'scrypt:32768:8:1'、'pbkdf2:sha256:600000')
+# - 驗證成功後若儲存的雜湊參數與目前設定不同，可由呼叫端重新雜湊 (needs_rehash)
+# - 可選擇在有上限的執行緒/行程池中驗證 (PASSWORD_VERIFY_POOL)，登入尖峰時雜湊運算不會佔滿所有 worker
+
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_HASH_METHOD = 'scrypt'
+DEFAULT_SALT_LENGTH = 16
+
+
+class PasswordPoolBusy(Exception):
+    """驗證池已滿且等待逾時"""
+
+
+def _config(key, default):
+    return current_app.config.get(key, default) if has_app_context() else default
+
+
+def hash_password(password):
+    """依目前設定產生密碼雜湊"""
+    return generate_password_hash(
+        password,
+        method=_config('PASSWORD_HASH_METHOD', DEFAULT_HASH_METHOD),
+        salt_length=_config('PASSWORD_SALT_LENGTH', DEFAULT_SALT_LENGTH)
+    )
+
+
+# 設定的雜湊方法 -> 完整參數前綴 (例如 'scrypt' -> 'scrypt:32768:8:1')
+_method_prefixes = {}
+
+def _method_prefix(method):
+    # 由 werkzeug 實際產生一次雜湊取得完整參數，確保與其預設值一致 (每種設定只計算一次)
+    if method not in _method_prefixes:
+        _method_prefixes[method] = generate_password_hash('', method=method).split('$', 1)[0]
+    return _method_prefixes[method]
+
+
+def needs_rehash(password_hash):
+    """儲存的雜湊方法/成本與目前設定不同時回傳 True"""
+    if not password_hash:
+        return False
+    method = _config('PASSWORD_HASH_METHOD', DEFAULT_HASH_METHOD)
+    return password_hash.split('$', 1)[0] != _method_prefix(method)
+
+
+# ==================================
+# 有上限的驗證池
+# ==================================
+
+_pool = None
+_slots = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """依設定建立驗證池；PASSWORD_VERIFY_POOL 未設定時回傳 None (直接在請求執行緒中驗證)"""
+    global _pool, _slots
+    kind = _config('PASSWORD_VERIFY_POOL', None)
+    if not kind:
+        return None
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = _config('PASSWORD_VERIFY_WORKERS', 2)
+                executor = ProcessPoolExecutor if kind == 'process' else ThreadPoolExecutor
+                # 等待中的驗證數量上限：每個 worker 最多排隊 PASSWORD_VERIFY_QUEUE 筆
+                _slots = threading.BoundedSemaphore(workers * (1 + _config('PASSWORD_VERIFY_QUEUE', 4)))
+                _pool = executor(max_workers=workers)
+    return _pool
+
+
+def verify_password(password_hash, password):
+    """
+    驗證密碼。啟用驗證池時，同時進行的雜湊運算數量受限於池的大小；
+    等待超過 PASSWORD_VERIFY_TIMEOUT 秒仍無空位時拋出 PasswordPoolBusy。
+    """
+    if not password_hash:
+        return False
+
+    pool = _get_pool()
+    if pool is None:
+        return check_password_hash(password_hash, password)
+
+    if not _slots.acquire(timeout=_config('PASSWORD_VERIFY_TIMEOUT', 5)):
+        raise PasswordPoolBusy()
+    try:
+        return pool.submit(check_password_hash, password_hash, password).result()
+    finally:
+        _slots.release()
+
+
+def shutdown_pool():
+    """關閉驗證池 (測試或重新載入設定時使用)"""
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = None
+        _slots = None
@@ -0,0 +1,76 @@
+# mealreg/services/scheduler.py
+# 行程內的截止凍結排程 (FREEZE_SCHEDULER_ENABLED = True 時啟用)：
+# 背景執行緒在每天 ORDER_CUTOFF_TIME 過後 FREEZE_DELAY_SECONDS 秒 (預設 60) 執行 freeze_closed_days()，
+# 啟動時也會先補凍結停機期間錯過的日期。
+# gunicorn 多個 worker 各自啟動排程也沒有關係：快照表頭的主鍵確保每個日期只會被凍結一次。
+# 不使用行程內排程時，改以 cron 在截止時間後執行 CLI，例如:
+#   1 11 * * *  flask --app wsgi freeze-orders
+
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from ..extensions import db
+from ..log import get_logger, log_event
+from .settings import get_setting
+from .snapshots import freeze_closed_days
+
+logger = get_logger(__name__)
+
+# 每次最多等待的秒數：等待期間修改 ORDER_CUTOFF_TIME，最晚在下一輪生效
+MAX_SLEEP_SECONDS = 600
+
+_stop = threading.Event()
+
+
+def next_run(now, cutoff, delay_seconds=0):
+    """下一次執行時間：今天的截止時間 + 延遲；已經過了則為明天"""
+    run_at = datetime.combine(now.date(), cutoff) + timedelta(seconds=delay_seconds)
+    if run_at <= now:
+        run_at += timedelta(days=1)
+    return run_at
+
+
+def start_freeze_scheduler(app):
+    """依設定啟動凍結排程的背景執行緒；未啟用時回傳 None"""
+    if not app.config.get('FREEZE_SCHEDULER_ENABLED', False):
+        return None
+    _stop.clear()
+    thread = threading.Thread(
+        target=_run, args=(app, app.config.get('FREEZE_DELAY_SECONDS', 60)),
+        name='freeze-scheduler', daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def stop_freeze_scheduler():
+    _stop.set()
+
+
+def _run(app, delay_seconds):
+    _freeze(app)
+    while not _stop.is_set():
+        with app.app_context():
+            run_at = next_run(datetime.now(), get_setting('ORDER_CUTOFF_TIME'), delay_seconds)
+        wait = (run_at - datetime.now()).total_seconds()
+        if _stop.wait(min(wait, MAX_SLEEP_SECONDS)):
+            break
+        if datetime.now() >= run_at:
+            _freeze(app)
+
+
+def _freeze(app):
+    with app.app_context():
+        try:
+            frozen = freeze_closed_days()
+        except Exception:
+            db.session.rollback()
+            logger.exception('freeze_failed')
+        else:
+            if frozen:
+                log_event(logger, 'orders_frozen', dates=[order_date.isoformat() for order_date in frozen])
+            else:
+                log_event(logger, 'orders_frozen', logging.DEBUG, dates=[])
+        finally:
+            db.session.remove()
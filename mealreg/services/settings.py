@@ -0,0 +1,156 @@
+# mealreg/services/settings.py
+# 系統設定服務 (Setting 表)：
+# - 所有已註冊的設定一次載入並轉為型別化的值 (time / int / bool / str)，之後從記憶體讀取
+# - 透過本服務寫入時立即更新本行程快取，並更新版本戳記 (_SETTINGS_VERSION)
+# - 多 worker 部署時，其他行程每隔 SETTINGS_REFRESH_INTERVAL 秒比對一次版本戳記，不同才重新載入
+
+import threading
+import time as _time
+import uuid
+from collections import namedtuple
+from datetime import time
+
+from flask import current_app
+from sqlalchemy import select
+
+from ..extensions import db
+from ..models.setting import Setting
+
+# 版本戳記所使用的設定鍵 (不屬於可編輯設定)
+VERSION_KEY = '_SETTINGS_VERSION'
+
+SettingSpec = namedtuple('SettingSpec', ['type', 'default', 'description'])
+
+# 已註冊的設定: 鍵 -> (型別, 預設值, 說明)
+SETTINGS_REGISTRY = {
+    'ORDER_CUTOFF_TIME': SettingSpec('time', time(12, 0), '訂單截止時間 (HH:MM)，超過後不可再訂購或刪除當日訂單'),
+    'ORDER_BOOKING_DAYS': SettingSpec('int', 14, '可預訂的天數 (今天之後最多幾天)'),
+}
+
+
+# ==================================
+# 型別轉換
+# ==================================
+
+def _parse_time(raw):
+    hour, minute = map(int, raw.strip().split(':'))
+    return time(hour, minute, 0)
+
+def _parse_bool(raw):
+    value = raw.strip().lower()
+    if value in ('1', 'true', 'yes', 'on'):
+        return True
+    if value in ('0', 'false', 'no', 'off'):
+        return False
+    raise ValueError(raw)
+
+_PARSERS = {
+    'time': _parse_time,
+    'int': lambda raw: int(raw.strip()),
+    'bool': _parse_bool,
+    'str': str,
+}
+
+_FORMATTERS = {
+    'time': lambda value: value.strftime('%H:%M'),
+    'int': str,
+    'bool': lambda value: 'true' if value else 'false',
+    'str': str,
+}
+
+
+def parse_setting(key, raw):
+    """將字串值轉為設定的型別，格式錯誤時拋出 ValueError"""
+    return _PARSERS[SETTINGS_REGISTRY[key].type](raw)
+
+
+def format_setting(key, value):
+    """將型別化的值轉回儲存用的字串"""
+    return _FORMATTERS[SETTINGS_REGISTRY[key].type](value)
+
+
+# ==================================
+# 快取
+# ==================================
+
+_values = None       # {key: 型別化的值}
+_version = None      # 目前載入的版本戳記
+_checked_at = 0.0    # 上次比對版本戳記的時間 (monotonic)
+_lock = threading.Lock()
+
+
+def _load_all():
+    """一次查詢所有設定並轉換型別；格式錯誤的值改用預設值"""
+    global _values, _version, _checked_at
+    rows = dict(db.session.execute(select(Setting.key, Setting.value)).all())
+
+    values = {}
+    for key, spec in SETTINGS_REGISTRY.items():
+        try:
+            values[key] = parse_setting(key, rows[key]) if key in rows else spec.default
+        except (ValueError, TypeError):
+            values[key] = spec.default
+    _values = values
+    _version = rows.get(VERSION_KEY)
+    _checked_at = _time.monotonic()
+
+
+def _ensure_fresh():
+    global _checked_at
+    interval = current_app.config.get('SETTINGS_REFRESH_INTERVAL', 5)
+    if _values is not None and _time.monotonic() - _checked_at < interval:
+        return
+
+    with _lock:
+        if _values is None:
+            _load_all()
+            return
+        if _time.monotonic() - _checked_at < interval:
+            return
+        # 只查詢版本戳記，其他行程有寫入時才重新載入全部設定
+        version = db.session.execute(select(Setting.value).where(Setting.key == VERSION_KEY)).scalar()
+        if version != _version:
+            _load_all()
+        else:
+            _checked_at = _time.monotonic()
+
+
+def get_setting(key):
+    """讀取設定的型別化值 (通常不需查詢資料庫)"""
+    _ensure_fresh()
+    return _values[key]
+
+
+def get_all_settings():
+    """讀取所有已註冊設定的型別化值"""
+    _ensure_fresh()
+    return dict(_values)
+
+
+def set_setting(key, raw):
+    """
+    驗證並寫入設定，同時更新版本戳記並 commit；本行程快取立即更新。
+    回傳型別化的新值；格式錯誤時拋出 ValueError。
+    """
+    global _version, _checked_at
+    value = parse_setting(key, raw)
+
+    db.session.merge(Setting(key=key, value=format_setting(key, value)))
+    version = uuid.uuid4().hex
+    db.session.merge(Setting(key=VERSION_KEY, value=version))
+    db.session.commit()
+
+    with _lock:
+        if _values is None:
+            _load_all()
+        else:
+            _values[key] = value
+            _version = version
+            _checked_at = _time.monotonic()
+    return value
+
+
+def invalidate_settings():
+    """清除快取，下次讀取時重新載入"""
+    global _values
+    _values = None
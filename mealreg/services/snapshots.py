@@ -0,0 +1,304 @@
+# mealreg/services/snapshots.py
+# 截止後的每日快照：
+# - 訂購日的 ORDER_CUTOFF_TIME 一過，當天訂單就不會再變動 (員工不可再訂購或刪除)
+# - freeze_day() 將當天的總計、各餐廳備餐清單與每位用戶的應繳金額寫入快照表
+#   (order_day_snapshot / canteen_production_snapshot / user_charge_snapshot)
+# - freeze_closed_days() 凍結所有已截止但尚未凍結的日期，由排程在截止時間觸發
+#   (flask freeze-orders 搭配 cron，或 services/scheduler.py 的行程內排程)
+# - 報表 (每日統計、備餐清單、應繳金額匯出) 對已凍結的日期讀取快照，未截止的日期即時彙總；
+#   已截止但排程尚未執行的日期在第一次讀取時當場凍結
+# 快照內容不會再變動，因此讀取結果另外快取在行程記憶體中；快取鍵包含快照表頭的凍結時間與總計 (每次以主鍵讀取表頭)，
+# 其他行程 (例如 CLI 的 --refreeze) 重新凍結後表頭改變，各 worker 的下一次讀取就會改用新的快照。
+# 已凍結的日期不可再由員工新增或刪除訂單 (即使之後把截止時間往後調)；總務以 POST /orders/batch 補登時，
+# 在同一個請求中重建該日快照 (unfreeze_days() 與訂單一起提交，再重新凍結)，快照不會與 order_record 不一致。
+
+from datetime import datetime
+
+from flask import g
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.exc import IntegrityError
+
+from ..extensions import db
+from ..models.canteen import Canteen
+from ..models.meal import Meal, MealRevision
+from ..models.order import Order
+from ..models.order_snapshot import CanteenProductionSnapshot, OrderDaySnapshot, UserChargeSnapshot
+from ..models.order_summary import OrderDailySummary
+from ..models.user import User
+from .cache import TTLCache
+from .settings import get_setting
+
+# 已凍結日期的備餐清單 {(order_date, canteen_id, 快照版本): payload}
+_production_cache = TTLCache(maxsize=256, ttl=3600)
+
+
+def is_closed(order_date, now=None):
+    """該訂購日是否已過截止時間 (過去的日期一律視為已截止)"""
+    now = now or datetime.now()
+    return now > datetime.combine(order_date, get_setting('ORDER_CUTOFF_TIME'))
+
+
+def production_stmt(order_date):
+    """
+    即時彙總：按便當版本統計當天的訂購數量與金額 (也用於寫入快照)。
+    只以整數的版本 ID 分組；名稱、價格、餐廳都由版本的主鍵決定 (MySQL 的 ONLY_FULL_GROUP_BY 可辨識此相依關係)。
+    """
+    return (
+        select(
+            Order.order_date,
+            Meal.canteen_id,
+            Order.meal_revision_id,
+            MealRevision.meal_id,
+            MealRevision.name.label('meal_name'),
+            Canteen.name.label('canteen_name'),
+            func.count(Order.id).label('order_count'),
+            (func.count(Order.id) * MealRevision.price).label('total_price_cents'),
+        )
+        .join(MealRevision, Order.meal_revision_id == MealRevision.id)
+        .join(Meal, MealRevision.meal_id == Meal.id)
+        .join(Canteen, Meal.canteen_id == Canteen.id)
+        .where(Order.order_date == order_date)
+        .group_by(Order.order_date, Order.meal_revision_id)
+    )
+
+
+def charges_stmt(order_date):
+    """即時彙總：每位用戶當天的訂單數與應繳金額 (也用於寫入快照)"""
+    return (
+        select(
+            Order.order_date,
+            Order.user_id,
+            func.count(Order.id).label('order_count'),
+            func.sum(MealRevision.price).label('amount_cents'),
+        )
+        .join(MealRevision, Order.meal_revision_id == MealRevision.id)
+        .where(Order.order_date == order_date)
+        .group_by(Order.order_date, Order.user_id)
+    )
+
+
+def freeze_day(order_date):
+    """
+    將該日期的總計、各餐廳備餐清單與每位用戶的應繳金額寫入快照並 commit。已凍結時不做任何事。
+    所有查詢都必須送到主資料庫 (唯讀請求中請經由 frozen_header() 呼叫)。
+    回傳 True 表示本次完成凍結；多個 worker 同時凍結時只有一個會成功 (表頭主鍵衝突)，其他回傳 False。
+    """
+    if db.session.get(OrderDaySnapshot, order_date) is not None:
+        return False
+
+    total_orders, total_cents = db.session.execute(
+        select(func.count(Order.id), func.coalesce(func.sum(MealRevision.price), 0))
+        .select_from(Order)
+        .join(MealRevision, Order.meal_revision_id == MealRevision.id)
+        .where(Order.order_date == order_date)
+    ).one()
+    try:
+        db.session.add(OrderDaySnapshot(
+            order_date=order_date, total_orders=total_orders, total_amount_cents=total_cents
+        ))
+        db.session.flush()
+        db.session.execute(
+            insert(CanteenProductionSnapshot).from_select(
+                ['order_date', 'canteen_id', 'meal_revision_id', 'meal_id', 'meal_name', 'canteen_name', 'order_count', 'total_price_cents'],
+                production_stmt(order_date)
+            )
+        )
+        db.session.execute(
+            insert(UserChargeSnapshot).from_select(
+                ['order_date', 'user_id', 'order_count', 'amount_cents'],
+                charges_stmt(order_date)
+            )
+        )
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return False
+    return True
+
+
+def frozen_dates(order_dates):
+    """這些日期中已凍結的日期 (一次查詢)"""
+    if not order_dates:
+        return set()
+    return set(db.session.scalars(
+        select(OrderDaySnapshot.order_date).where(OrderDaySnapshot.order_date.in_(order_dates))
+    ))
+
+
+def frozen_message(order_date):
+    return f"{order_date.isoformat()} 的訂單已凍結 (備餐清單已產生)，無法再新增或刪除；請洽總務人員。"
+
+
+def unfreeze_days(order_dates):
+    """刪除這些日期的快照 (不 commit；與變更訂單的交易一起提交，之後再呼叫 freeze_day 重新凍結)"""
+    for model in (CanteenProductionSnapshot, UserChargeSnapshot, OrderDaySnapshot):
+        db.session.execute(
+            delete(model).where(model.order_date.in_(order_dates)).execution_options(synchronize_session=False)
+        )
+
+
+def refreeze_day(order_date):
+    """刪除該日期的快照後重新凍結 (更正訂單時使用)；回傳是否完成凍結"""
+    unfreeze_days([order_date])
+    db.session.commit()
+    invalidate_snapshot_cache()
+    return freeze_day(order_date)
+
+
+def pending_dates(now=None):
+    """已截止、有訂單但尚未凍結的日期 (由每日統計表查詢，不掃描 order_record)"""
+    now = now or datetime.now()
+    frozen = select(OrderDaySnapshot.order_date)
+    stmt = (
+        select(OrderDailySummary.order_date)
+        .where(
+            OrderDailySummary.order_date <= now.date(),
+            OrderDailySummary.order_count > 0,
+            OrderDailySummary.order_date.not_in(frozen)
+        )
+        .group_by(OrderDailySummary.order_date)
+        .order_by(OrderDailySummary.order_date)
+    )
+    return [order_date for order_date in db.session.scalars(stmt) if is_closed(order_date, now)]
+
+
+def _has_orders(order_date):
+    """該日期在每日統計表中是否有訂單 (與 pending_dates 相同的條件，不掃描 order_record)"""
+    return db.session.scalar(
+        select(OrderDailySummary.order_date)
+        .where(OrderDailySummary.order_date == order_date, OrderDailySummary.order_count > 0)
+        .limit(1)
+    ) is not None
+
+
+def freeze_closed_days(now=None):
+    """凍結所有已截止但尚未凍結的日期，回傳本次凍結的日期列表 (可重複執行)"""
+    return [order_date for order_date in pending_dates(now) if freeze_day(order_date)]
+
+
+def frozen_header(order_date):
+    """
+    回傳該日期的快照表頭；已截止但尚未凍結時先凍結。未截止時回傳 None (呼叫端改為即時彙總)。
+    沒有訂單的日期 (例如查詢很久以前的日期) 不寫入快照，同樣回傳 None，由呼叫端回傳空的即時結果。
+    在 @read_replica() 的請求中當場凍結時，本次請求之後的查詢全部改走主資料庫：
+    凍結的統計 (SELECT) 與寫入 (INSERT ... SELECT) 必須讀取同一份資料，否則表頭總計可能與明細不一致；
+    呼叫端接著讀取的快照明細也才看得到剛寫入的資料。
+    """
+    header = db.session.get(OrderDaySnapshot, order_date)
+    if header is None and is_closed(order_date) and _has_orders(order_date):
+        g.pop('db_use_replica', None)
+        freeze_day(order_date)
+        header = db.session.get(OrderDaySnapshot, order_date)
+    return header
+
+
+def meal_totals_stmt(order_date):
+    """由備餐清單快照取得各便當版本的數量與金額 (每個版本只屬於一家餐廳，每天只有一列)"""
+    return (
+        select(
+            CanteenProductionSnapshot.meal_name,
+            CanteenProductionSnapshot.order_count,
+            CanteenProductionSnapshot.total_price_cents,
+        )
+        .where(CanteenProductionSnapshot.order_date == order_date)
+        .order_by(CanteenProductionSnapshot.meal_name, CanteenProductionSnapshot.meal_revision_id)
+    )
+
+
+def charges_range_stmt(start_date, end_date):
+    """
+    日期區間內每位用戶每天的訂單數與應繳金額 (含用戶名稱)：已凍結的日期讀取 user_charge_snapshot，
+    其餘日期 (尚未截止) 由 order_record 即時彙總；兩者以 UNION ALL 合併為同一個串流查詢。
+    """
+    frozen = (
+        select(OrderDaySnapshot.order_date)
+        .where(OrderDaySnapshot.order_date.between(start_date, end_date))
+    )
+    snapshot = (
+        select(
+            UserChargeSnapshot.order_date, UserChargeSnapshot.user_id, User.username,
+            UserChargeSnapshot.order_count, UserChargeSnapshot.amount_cents,
+            literal(True).label('frozen'),
+        )
+        .join(User, UserChargeSnapshot.user_id == User.id)
+        .where(UserChargeSnapshot.order_date.between(start_date, end_date))
+    )
+    live = (
+        select(
+            Order.order_date, Order.user_id, User.username,
+            func.count(Order.id).label('order_count'),
+            func.sum(MealRevision.price).label('amount_cents'),
+            literal(False).label('frozen'),
+        )
+        .join(MealRevision, Order.meal_revision_id == MealRevision.id)
+        .join(User, Order.user_id == User.id)
+        .where(Order.order_date.between(start_date, end_date), Order.order_date.not_in(frozen))
+        .group_by(Order.order_date, Order.user_id, User.username)
+    )
+    return snapshot.union_all(live).order_by('order_date', 'user_id')
+
+
+def get_production(order_date, canteen_id=None):
+    """
+    各餐廳的備餐清單。已截止的日期讀取快照 (必要時先凍結)，未截止的日期即時彙總。
+    回傳 {'order_date', 'frozen', 'frozen_at', 'canteens': [...]}。
+    """
+    header = frozen_header(order_date)
+    if header is not None:
+        cache_key = (order_date, canteen_id, header.frozen_at, header.total_orders, header.total_amount_cents)
+        cached = _production_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        stmt = select(
+            CanteenProductionSnapshot.canteen_id, CanteenProductionSnapshot.canteen_name,
+            CanteenProductionSnapshot.meal_id, CanteenProductionSnapshot.meal_name,
+            CanteenProductionSnapshot.order_count, CanteenProductionSnapshot.total_price_cents,
+        ).where(CanteenProductionSnapshot.order_date == order_date)
+        if canteen_id:
+            stmt = stmt.where(CanteenProductionSnapshot.canteen_id == canteen_id)
+    else:
+        stmt = production_stmt(order_date)
+        if canteen_id:
+            stmt = stmt.where(Meal.canteen_id == canteen_id)
+
+    payload = {
+        'order_date': order_date.isoformat(),
+        'frozen': header is not None,
+        'frozen_at': header.frozen_at if header is not None else None,
+        'canteens': _group_by_canteen(db.session.execute(stmt)),
+    }
+    if header is not None:
+        _production_cache.set(cache_key, payload)
+    return payload
+
+
+def _group_by_canteen(rows):
+    canteens = {}
+    for row in rows:
+        canteen = canteens.get(row.canteen_id)
+        if canteen is None:
+            canteen = canteens[row.canteen_id] = {
+                'canteen_id': row.canteen_id,
+                'canteen_name': row.canteen_name,
+                'total_orders': 0,
+                'total_amount_cents': 0,
+                'meals': [],
+            }
+        canteen['total_orders'] += row.order_count
+        canteen['total_amount_cents'] += row.total_price_cents
+        canteen['meals'].append({
+            'meal_id': row.meal_id,
+            'meal_name': row.meal_name,
+            'count': row.order_count,
+            'total_price': row.total_price_cents / 100.0,
+        })
+    result = [canteens[key] for key in sorted(canteens)]
+    for canteen in result:
+        canteen['total_amount'] = canteen.pop('total_amount_cents') / 100.0
+        canteen['meals'].sort(key=lambda meal: (meal['meal_name'], meal['meal_id']))
+    return result
+
+
+def invalidate_snapshot_cache():
+    """重新凍結或刪除快照後呼叫 (只清除本行程的快取；其他行程依表頭版本自動改用新的快照)"""
+    _production_cache.clear()
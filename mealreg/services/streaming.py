@@ -0,0 +1,85 @@
+# mealreg/services/streaming.py
+# 串流回應工具：逐列產生輸出，不將整個結果集載入記憶體
+
+import csv
+import io
+
+from flask import current_app, stream_with_context
+
+from ..extensions import db
+
+# 每次從資料庫游標取回的列數 (伺服器端游標 / yield_per)
+STREAM_BATCH_SIZE = 1000
+
+
+def stream_rows(stmt, batch_size=None):
+    """以伺服器端游標分批執行查詢，逐列回傳 Row (不建立 ORM 物件)"""
+    batch_size = batch_size or current_app.config.get('STREAM_BATCH_SIZE', STREAM_BATCH_SIZE)
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+    try:
+        for row in result:
+            yield row
+    finally:
+        result.close()
+
+
+def json_array_response(rows, row_to_dict):
+    """
+    將列逐筆序列化為 JSON 陣列並以串流回應輸出，記憶體用量與總列數無關。
+    rows: 可迭代的資料列；row_to_dict: 將單列轉為 dict 的函式。
+    """
+    dumps = current_app.json.dumps
+
+    def generate():
+        yield '['
+        first = True
+        for row in rows:
+            if not first:
+                yield ','
+            first = False
+            yield dumps(row_to_dict(row))
+        yield ']'
+
+    return current_app.response_class(stream_with_context(generate()), mimetype='application/json')
+
+
+def ndjson_response(rows, row_to_dict, filename=None):
+    """每列輸出一行 JSON (NDJSON)，適合逐行匯入的下游系統"""
+    dumps = current_app.json.dumps
+
+    def generate():
+        for row in rows:
+            yield dumps(row_to_dict(row)) + '\n'
+
+    return _attachment(
+        current_app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson'),
+        filename
+    )
+
+
+def csv_response(rows, columns, row_to_values, filename=None):
+    """
+    以 CSV 串流輸出：先輸出標題列，之後每列寫入一個小緩衝區後立即送出。
+    開頭加上 UTF-8 BOM，讓 Excel 正確顯示中文。
+    """
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield '\ufeff' + buffer.getvalue()
+        for row in rows:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow(row_to_values(row))
+            yield buffer.getvalue()
+
+    return _attachment(
+        current_app.response_class(stream_with_context(generate()), mimetype='text/csv'),
+        filename
+    )
+
+
+def _attachment(response, filename):
+    if filename:
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
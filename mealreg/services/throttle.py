@@ -0,0 +1,91 @@
+# mealreg/services/throttle.py
+# 登入節流 (Token Bucket)：依用戶名稱與來源 IP 分別限制嘗試次數，
+# 在查詢 User 與計算密碼雜湊之前就拒絕超量的請求，攻擊者每次嘗試只花費微秒等級的成本。
+# 預設使用行程內的 MemoryThrottleStore；多 worker 需共用計數時，可透過 set_throttle_store() 替換為共享儲存。
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+
+class ThrottleStore:
+    """節流儲存介面：consume() 嘗試取用一個 token，回傳 (是否允許, 建議重試秒數)"""
+
+    def consume(self, key, capacity, refill_per_second):
+        raise NotImplementedError
+
+
+class MemoryThrottleStore(ThrottleStore):
+    """
+    行程內的 token bucket: {key: (剩餘 token 數, 上次更新時間, 容量, 每秒回補數)}
+    每個 bucket 保存自己的容量與回補速度 (用戶與 IP 的 bucket 設定不同)；
+    key 數超過 max_keys 時以 LRU 順序淘汰最久未使用的 bucket，每次只淘汰 O(1) 個，不重建整個字典。
+    持續嘗試的來源每次都會更新自己的 bucket，不會因為攻擊者輪換大量 key 而被淘汰重置。
+    """
+
+    def __init__(self, max_keys=100000):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_keys = max_keys
+
+    def consume(self, key, capacity, refill_per_second):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = capacity
+            else:
+                tokens, updated_at, _, _ = bucket
+                tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+                self._buckets.move_to_end(key)
+            if tokens >= 1:
+                tokens -= 1
+                allowed, retry_after = True, 0
+            else:
+                allowed, retry_after = False, (1 - tokens) / refill_per_second
+            self._buckets[key] = (tokens, now, capacity, refill_per_second)
+            while len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+_store = MemoryThrottleStore()
+
+
+def set_throttle_store(store):
+    """替換節流儲存 (例如多 worker 共用的外部儲存)"""
+    global _store
+    _store = store
+
+
+def check_login_throttle(username, remote_addr):
+    """
+    檢查登入嘗試是否超過限制；允許時回傳 None，否則回傳建議的重試秒數 (整數)。
+    用戶名稱與 IP 各有一個 bucket，任一個用完即拒絕。
+    """
+    config = current_app.config
+    if not config.get('LOGIN_THROTTLE_ENABLED', True):
+        return None
+
+    checks = [
+        # 同一帳號: 預設最多連續 5 次，之後每 12 秒回補 1 次
+        (f'login:user:{username.lower()}',
+         config.get('LOGIN_THROTTLE_USER_CAPACITY', 5), config.get('LOGIN_THROTTLE_USER_REFILL', 5 / 60)),
+        # 同一 IP: 較寬鬆。整個辦公室常共用 NAT 出口 IP，上班時段數百人會在幾分鐘內同時登入，
+        # 預設可連續 300 次、每秒回補 5 次；位於反向代理之後時請設定 PROXY_FIX_X_FOR，
+        # 否則 remote_addr 都是代理的位址，所有用戶會共用同一個 bucket
+        (f'login:ip:{remote_addr}',
+         config.get('LOGIN_THROTTLE_IP_CAPACITY', 300), config.get('LOGIN_THROTTLE_IP_REFILL', 5.0)),
+    ]
+    for key, capacity, refill in checks:
+        allowed, retry_after = _store.consume(key, capacity, refill)
+        if not allowed:
+            return max(1, math.ceil(retry_after))
+    return None
@@ -0,0 +1,51 @@
+# mealreg/services/token_store.py
+# JWT 撤銷清單 (登出 / 撤銷裝置)：以 jti 為鍵的記憶體字典，每次檢查為 O(1)。
+# 只保存到 Token 原本的過期時間為止，過期的項目定期清除，記憶體用量不會無限成長。
+# 以 JWT_REVOCATION_ENABLED 啟用；多 worker 部署需共用撤銷狀態時，可替換為實作相同介面的共享儲存。
+
+import threading
+import time
+
+from flask import current_app
+
+from ..extensions import jwt
+
+
+class MemoryRevocationStore:
+    """行程內的撤銷清單: {jti: 過期時間 (epoch 秒)}"""
+
+    def __init__(self, prune_interval=60):
+        self._revoked = {}
+        self._lock = threading.Lock()
+        self._prune_interval = prune_interval
+        self._pruned_at = time.time()
+
+    def revoke(self, jti, expires_at):
+        with self._lock:
+            self._revoked[jti] = expires_at
+            self._prune()
+
+    def is_revoked(self, jti):
+        return jti in self._revoked
+
+    def _prune(self):
+        now = time.time()
+        if now - self._pruned_at < self._prune_interval:
+            return
+        self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+        self._pruned_at = now
+
+
+revocation_store = MemoryRevocationStore()
+
+
+def revoke_token(jwt_payload):
+    """撤銷指定的 Token (直到其原本的過期時間)"""
+    revocation_store.revoke(jwt_payload['jti'], jwt_payload.get('exp', time.time() + 86400))
+
+
+@jwt.token_in_blocklist_loader
+def is_token_revoked(_jwt_header, jwt_payload):
+    if not current_app.config.get('JWT_REVOCATION_ENABLED', False):
+        return False
+    return revocation_store.is_revoked(jwt_payload['jti'])
@@ -0,0 +1,89 @@
+# mealreg/services/user_cache.py
+# 目前登入用戶的載入與快取：
+# 透過 flask_jwt_extended 的 user_lookup_loader，每個請求只載入一次用戶 (之後以 current_user 取用)，
+# 並以 TTL/LRU 快取 (id, is_admin, username)，管理員連續操作時不必每次都查詢 user 表。
+
+from collections import namedtuple
+
+from flask import current_app, jsonify
+from sqlalchemy import event, select
+
+from ..extensions import db, jwt
+from ..models.user import User
+from .cache import TTLCache
+
+# 快取內容只保留權限檢查需要的欄位，不保存 ORM 物件 (避免跨 session 使用)
+CachedUser = namedtuple('CachedUser', ['id', 'is_admin', 'username'])
+
+_user_cache = TTLCache(maxsize=1024, ttl=300)
+
+
+def configure_user_cache(app):
+    """依 app.config 設定快取容量與存活時間"""
+    _user_cache.maxsize = app.config.get('USER_CACHE_SIZE', 1024)
+    _user_cache.ttl = app.config.get('USER_CACHE_TTL', 300)
+
+
+def get_cached_user(user_id):
+    """依用戶 ID 取得 CachedUser，快取未命中時才查詢資料庫；用戶不存在時回傳 None"""
+    user = _user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    row = db.session.execute(
+        select(User.id, User.is_admin, User.username).where(User.id == user_id)
+    ).first()
+    if row is None:
+        return None
+
+    user = CachedUser(row.id, bool(row.is_admin), row.username)
+    _user_cache.set(user_id, user)
+    return user
+
+
+def invalidate_user(user_id):
+    """用戶資料異動時移除快取"""
+    _user_cache.pop(user_id)
+
+
+def user_claims(user):
+    """
+    登入時要嵌入 Access Token 的額外聲明 (claims)。
+    開啟 JWT_EMBED_ADMIN_CLAIM 後，is_admin 與 username 直接由簽章保護的 Token 提供，權限檢查完全不需查詢資料庫；
+    代價是權限變更要等 Access Token 過期後才會生效 (/auth/refresh 一律重新讀取用戶，不沿用 Refresh Token 內的聲明)。
+    """
+    if not current_app.config.get('JWT_EMBED_ADMIN_CLAIM', False):
+        return {}
+    return {'is_admin': bool(user.is_admin), 'username': user.username}
+
+
+# ==================================
+# flask_jwt_extended 回呼註冊
+# ==================================
+
+@jwt.user_lookup_loader
+def load_current_user(_jwt_header, jwt_data):
+    """每個 @jwt_required() 請求載入一次，結果可透過 current_user 取得"""
+    user_id = int(jwt_data['sub'])
+
+    # Token 內已帶有簽章保護的權限聲明時，直接使用，不查詢資料庫
+    if current_app.config.get('JWT_EMBED_ADMIN_CLAIM', False) and 'is_admin' in jwt_data:
+        return CachedUser(user_id, bool(jwt_data['is_admin']), jwt_data.get('username'))
+
+    return get_cached_user(user_id)
+
+
+@jwt.user_lookup_error_loader
+def user_lookup_error(_jwt_header, jwt_data):
+    # 維持 APIFlask 的錯誤格式 (message / detail)
+    return jsonify(message="用戶不存在。", detail={}), 401
+
+
+# ==================================
+# User 資料異動時讓快取失效
+# ==================================
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_on_change(_mapper, _connection, target):
+    invalidate_user(target.id)
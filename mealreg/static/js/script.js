@@ -47,7 +47,8 @@ async function callAPI(endpoint, method = 'GET', data = null, authRequired = tru
         const result = await response.json();
 
         if (response.ok) {
-            return { success: true, status: response.status, data: result };
+            // 列表端點採 keyset 分頁：還有下一頁時回應標頭 X-Next-Cursor 會提供游標
+            return { success: true, status: response.status, data: result, nextCursor: response.headers.get('X-Next-Cursor') };
         } else {
             // 處理 API 返回的錯誤 (400, 403, 409, 500)
             return { success: false, status: response.status, message: result.message || `API 請求失敗: ${response.status}` };
@@ -58,6 +59,22 @@ async function callAPI(endpoint, method = 'GET', data = null, authRequired = tru
     }
 }
 
+// 取得分頁列表的全部資料 (/orders/mine、/admin/canteens、/admin/meals)
+// 依回應標頭 X-Next-Cursor 逐頁帶入 cursor 參數，直到沒有下一頁為止；回傳格式與 callAPI 相同
+async function callAPIAllPages(endpoint, authRequired = true) {
+    const separator = endpoint.includes('?') ? '&' : '?';
+    let result = await callAPI(endpoint, 'GET', null, authRequired);
+    const items = result.success ? result.data : [];
+
+    while (result.success && result.nextCursor) {
+        result = await callAPI(`${endpoint}${separator}cursor=${encodeURIComponent(result.nextCursor)}`, 'GET', null, authRequired);
+        if (result.success) {
+            items.push(...result.data);
+        }
+    }
+    return result.success ? { ...result, data: items } : result;
+}
+
 // --- 輔助函式區域：UI 控制 ---
 
 // 導航到指定頁面區塊
@@ -323,7 +340,7 @@ async function showEmployeeHistoryPage() {
     const today = new Date().toISOString().slice(0, 10); // YYYY-MM-DD
     
     // 1. 呼叫 API 獲取訂單歷史
-    const result = await callAPI('/orders/mine', 'GET', null, true);
+    const result = await callAPIAllPages('/orders/mine');
 
     if (result.success && result.data.length > 0) {
         tableBody.innerHTML = '';
@@ -566,7 +583,7 @@ async function loadCanteensForAdmin() {
     canteenListElement.innerHTML = '<div class="spinner-border spinner-border-sm text-primary" role="status"></div> 載入中...';
     
     // 呼叫 API 獲取所有餐廳 (包括不活躍的)
-    const result = await callAPI('/admin/canteens', 'GET', null, true);
+    const result = await callAPIAllPages('/admin/canteens');
 
     if (result.success) {
         canteenListElement.innerHTML = '';
@@ -608,7 +625,7 @@ async function loadMealsForAdmin() {
     mealListElement.innerHTML = '<div class="spinner-border spinner-border-sm text-primary" role="status"></div> 載入中...';
     
     // 呼叫 API 獲取所有便當
-    const result = await callAPI('/admin/meals', 'GET', null, true);
+    const result = await callAPIAllPages('/admin/meals');
 
     if (result.success) {
         mealListElement.innerHTML = '';
@@ -726,7 +743,7 @@ async function populateCanteenDropdown(selectedCanteenId = null) {
     const dropdown = document.getElementById('meal-canteen');
     dropdown.innerHTML = '<option value="">載入中...</option>';
     
-    const result = await callAPI('/admin/canteens', 'GET', null, true);
+    const result = await callAPIAllPages('/admin/canteens');
     
     dropdown.innerHTML = '';
     if (result.success && result.data.length > 0) {
@@ -0,0 +1,14 @@
+# wsgi.py
+# 正式環境 WSGI 入口，例如:
+#   flask --app wsgi init-db        # 部署時執行一次：建立資料表與預設資料
+#   gunicorn -w 4 -b 0.0.0.0:8000 wsgi:app
+#   (放在 nginx 等反向代理之後時，於設定中加上 PROXY_FIX_X_FOR = 1，登入節流才會以真正的用戶端 IP 計算)
+# 建立應用程式時不連線資料庫；每個 worker 在第一個請求時才由連線池建立連線 (參數見 services/db_pool.py)。
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from mealreg import create_app
+
+app = create_app()